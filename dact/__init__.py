@@ -0,0 +1,28 @@
+"""
+dact
+====
+Python helpers shared across the book: the chapters' code blocks, the
+figures they draw and the manim animations under public/assets/.
+
+Modules that need manim live in dact.anim, so chapter code can import the
+rest of the package without it. Run from the project root (or with it on
+PYTHONPATH); scripts/render-scene.py and scripts/preprocess-python-qmd.py
+put it there, and the preprocessor also puts dact itself in every code
+block's namespace.
+
+Submodules are imported the first time they are used, so after a plain
+import dact, dact.balance.balance_table(...) works without importing
+dact.balance (or anything it needs) up front.
+"""
+
+import importlib
+
+
+def __getattr__(name):
+    if not name.startswith('_'):
+        try:
+            return importlib.import_module(f"{__name__}.{name}")
+        except ModuleNotFoundError as error:
+            if error.name != f"{__name__}.{name}":
+                raise
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
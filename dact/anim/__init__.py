@@ -0,0 +1,5 @@
+"""
+dact.anim
+=========
+Helpers for the manim scenes under public/assets/*/animations/.
+"""
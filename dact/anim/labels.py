@@ -0,0 +1,56 @@
+"""
+Labels
+======
+Text, MarkupText and MathTex mobjects built once per process and handed
+out as copies.
+
+manim caches the SVG it renders for a string on disk, but every Text or
+MathTex still parses that SVG and builds its paths again, and scenes ask
+for the same strings over and over: panel titles, axis letters, tick
+labels, table cells. Here each label is built the first time it is asked
+for, keyed by its class, string(s), scale and style (font, weight, slant,
+color, ...), and every call returns a copy of it ready to position:
+
+    title = text_label("Probability distribution of", scale=0.4,
+                       font="Latin Modern Roman", color=WHITE)
+"""
+
+from manim import MarkupText, MathTex, Text
+
+_atlas = {}
+
+
+def _style_key(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_style_key(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _style_key(item)) for key, item in value.items()))
+    return value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+
+
+def _label(cls, strings, scale, kwargs):
+    key = (cls.__name__, strings, float(scale), _style_key(kwargs))
+    label = _atlas.get(key)
+    if label is None:
+        label = _atlas[key] = cls(*strings, **kwargs).scale(scale)
+    return label.copy()
+
+
+def text_label(string, scale=1, **kwargs):
+    """A copy of Text(string, **kwargs).scale(scale)."""
+    return _label(Text, (string,), scale, kwargs)
+
+
+def markup_label(string, scale=1, **kwargs):
+    """A copy of MarkupText(string, **kwargs).scale(scale)."""
+    return _label(MarkupText, (string,), scale, kwargs)
+
+
+def tex_label(*strings, scale=1, **kwargs):
+    """A copy of MathTex(*strings, **kwargs).scale(scale)."""
+    return _label(MathTex, strings, scale, kwargs)
+
+
+def atlas_size():
+    """How many distinct labels have been built in this process."""
+    return len(_atlas)
@@ -0,0 +1,62 @@
+"""
+Residual Overlays
+=================
+The residual segments and squared-residual squares of candidate regression
+lines (dact.regression.LineFits), as manim mobjects.
+
+The geometry of every residual of every line is computed in one batch:
+where each data point and its fitted value land on the axes, and the four
+corners of the square drawn on each residual (on the side of the segment
+away from the line's rise: to the left above the line, to the right below
+it). Mobjects are only built for the line a scene is showing, one per
+residual, so they can be passed to LaggedStart; update() reshapes existing
+ones instead, for lines that move under an updater.
+"""
+
+import numpy as np
+from manim import Line, Polygon, VGroup
+
+from dact.anim.axes import axes_points
+
+
+class ResidualGeometry:
+    """
+    Scene coordinates of the residuals of every line in fits on axes.
+
+    data_points  (k, n, 3) the data points
+    line_points  (k, n, 3) the fitted values on each line
+    corners      (k, n, 4, 3) each residual's square: fitted value, data
+                 point, then the two corners one side length across
+    """
+
+    def __init__(self, axes, fits):
+        self.fits = fits
+        k, n = fits.residuals.shape
+        x = np.broadcast_to(fits.x, (k, n))
+        self.data_points = axes_points(axes, x, np.broadcast_to(fits.y, (k, n))).reshape(k, n, 3)
+        self.line_points = axes_points(axes, x, fits.fitted).reshape(k, n, 3)
+
+        # Squares are as wide as the residual is tall on screen
+        height = self.data_points[..., 1] - self.line_points[..., 1]
+        across = np.zeros((k, n, 3))
+        across[..., 0] = np.where(fits.residuals > 0, -np.abs(height), np.abs(height))
+        self.corners = np.stack([self.line_points, self.data_points,
+                                 self.data_points + across, self.line_points + across], axis=2)
+
+    def lines(self, index, **style):
+        """VGroup of one Line per residual of line index, data point to fitted value."""
+        return VGroup(*[Line(start, end, **style) for start, end in
+                        zip(self.data_points[index], self.line_points[index])])
+
+    def squares(self, index, **style):
+        """VGroup of one square Polygon per residual of line index."""
+        return VGroup(*[Polygon(*corners, **style) for corners in self.corners[index]])
+
+    def update(self, index, lines=None, squares=None):
+        """Move existing lines() and squares() mobjects onto line index."""
+        if lines is not None:
+            for line, start, end in zip(lines, self.data_points[index], self.line_points[index]):
+                line.put_start_and_end_on(start, end)
+        if squares is not None:
+            for square, corners in zip(squares, self.corners[index]):
+                square.set_points_as_corners([*corners, corners[0]])
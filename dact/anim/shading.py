@@ -0,0 +1,54 @@
+"""
+Shaded Areas
+============
+Filled regions under sampled distribution curves, for the distribution
+panels of the animations (dichotomous_choice.py and friends).
+
+The curve is passed in as the arrays it was plotted from, so the density
+is evaluated once per curve: a region is the samples inside its bounds
+plus the curve's height at each bound, interpolated from those samples.
+Points go through the axes in one vectorized call (see axes_points).
+"""
+
+import numpy as np
+from manim import Polygon
+
+from dact.anim.axes import axes_points
+
+# Solid fill with no outline, so neighbouring regions meet without a seam
+AREA_STYLE = {'fill_opacity': 1, 'stroke_width': 0, 'stroke_opacity': 0}
+
+
+def area_points(axes, x, y, start=None, end=None):
+    """
+    Scene points outlining the region between the curve (x, y) and the
+    x axis from start to end (default: the ends of x): along the axis at
+    start, up the curve to end, back down to the axis. x must be
+    increasing.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    start = x[0] if start is None else max(start, x[0])
+    end = x[-1] if end is None else min(end, x[-1])
+    inside = (x > start) & (x < end)
+    xs = np.concatenate(([start], x[inside], [end]))
+    ys = np.concatenate(([np.interp(start, x, y)], y[inside], [np.interp(end, x, y)]))
+    return axes_points(axes, np.concatenate(([start], xs, [end])),
+                       np.concatenate(([0.0], ys, [0.0])))
+
+
+def area_under(axes, x, y, start=None, end=None, color=None, **style):
+    """A Polygon filling the area under the curve (x, y) from start to end."""
+    style = {**AREA_STYLE, **style}
+    if color is not None:
+        style['fill_color'] = color
+    return Polygon(*area_points(axes, x, y, start, end), **style)
+
+
+def split_area(axes, x, y, threshold, left_color, right_color, **style):
+    """
+    The area under the curve (x, y) split at threshold, as (left, right)
+    Polygons filled left_color and right_color.
+    """
+    return (area_under(axes, x, y, end=threshold, color=left_color, **style),
+            area_under(axes, x, y, start=threshold, color=right_color, **style))
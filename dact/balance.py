@@ -0,0 +1,88 @@
+"""
+Covariate Balance
+=================
+Balance tables for comparing a treated and a control group: the mean of
+each covariate in both groups, their difference, the standardized mean
+difference and the variance ratio.
+
+The means and variances of every covariate in every group come from one
+groupby over the DataFrame instead of filtering it once per covariate and
+group, and the differences are then computed for all covariates at once:
+
+    balance = balance_table(df_obs, ['age', 'educ', 're74'])
+    balance['std_diff']
+
+Chapter code can use this without importing it: the preprocessor puts the
+dact package in every block's namespace (dact.balance.balance_table).
+"""
+
+import numpy as np
+import pandas as pd
+
+BALANCE_COLUMNS = ['treated_mean', 'control_mean', 'difference', 'std_diff', 'variance_ratio']
+
+
+def group_moments(df, covariates, by):
+    """
+    Mean and variance (ddof=1) of each covariate in each group of by, in
+    one pass: a DataFrame indexed by group with (covariate, 'mean' | 'var')
+    columns.
+    """
+    return df.groupby(by)[list(covariates)].agg(['mean', 'var'])
+
+
+def standardized_difference(treated_mean, control_mean, treated_var, control_var):
+    """
+    Difference in means over the pooled standard deviation,
+    sqrt((treated_var + control_var) / 2); 0 where that is 0 or undefined.
+    Works elementwise on arrays and Series.
+    """
+    pooled_sd = np.sqrt((np.asarray(treated_var, dtype=float)
+                         + np.asarray(control_var, dtype=float)) / 2)
+    difference = np.asarray(treated_mean, dtype=float) - np.asarray(control_mean, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(pooled_sd > 0, difference / pooled_sd, 0.0)
+
+
+def variance_ratio(treated_var, control_var):
+    """Treated over control variance; NaN where the control variance is 0."""
+    treated_var = np.asarray(treated_var, dtype=float)
+    control_var = np.asarray(control_var, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(control_var > 0, treated_var / control_var, np.nan)
+
+
+def _table(covariates, treated_mean, control_mean, treated_var, control_var):
+    treated_mean = np.asarray(treated_mean, dtype=float)
+    control_mean = np.asarray(control_mean, dtype=float)
+    return pd.DataFrame({
+        'treated_mean': treated_mean,
+        'control_mean': control_mean,
+        'difference': treated_mean - control_mean,
+        'std_diff': standardized_difference(treated_mean, control_mean, treated_var, control_var),
+        'variance_ratio': variance_ratio(treated_var, control_var),
+    }, index=pd.Index(list(covariates), name='variable'), columns=BALANCE_COLUMNS)
+
+
+def balance_table(df, covariates, treatment='treat', treated=1, control=0):
+    """
+    Balance of covariates between the rows of df with treatment == treated
+    and those with treatment == control: a DataFrame indexed by covariate
+    with columns treated_mean, control_mean, difference, std_diff and
+    variance_ratio.
+    """
+    moments = group_moments(df, covariates, treatment)
+    means = moments.xs('mean', axis=1, level=1)[list(covariates)]
+    variances = moments.xs('var', axis=1, level=1)[list(covariates)]
+    return _table(covariates, means.loc[treated], means.loc[control],
+                  variances.loc[treated], variances.loc[control])
+
+
+def sample_balance(treated, control, covariates):
+    """
+    balance_table() for two separate DataFrames, e.g. the treated units and
+    their matched controls (rows may repeat when matching with replacement).
+    """
+    treated = treated[list(covariates)]
+    control = control[list(covariates)]
+    return _table(covariates, treated.mean(), control.mean(), treated.var(), control.var())
@@ -0,0 +1,160 @@
+"""
+Distribution Curves
+===================
+Sampled density curves (x grid, pdf, cdf and a table of quantiles) for the
+distributions drawn in scenes, chapter figures and interactives.
+
+A curve is computed once per set of parameters and kept twice: in memory
+for the rest of the process, and as a compressed .npz file under CURVE_DIR
+keyed by a hash of the parameters (and the SciPy version), so later runs
+and other scripts load it instead of evaluating the distribution again.
+
+    normal = distribution_curve('norm', (-3, 3))
+    ax.plot_line_graph(normal.x, normal.pdf)
+
+Distributions are named as in scipy.stats; parameters are passed as its
+keyword arguments (a=2.0, loc=-1.0, scale=1.8 for a gamma).
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import scipy
+from scipy import stats
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CURVE_DIR = Path(os.environ.get('DACT_CURVE_DIR', PROJECT_ROOT / ".cache" / "curves"))
+CURVE_VERSION = 1
+
+DEFAULT_POINTS = 500
+DEFAULT_PROBABILITIES = (0.001, 0.01, 0.025, 0.05, 0.1, 0.2, 0.25, 0.5,
+                         0.75, 0.8, 0.9, 0.95, 0.975, 0.99, 0.999)
+
+_memo = {}
+
+
+class DistributionCurve:
+    """
+    A distribution sampled on an even grid. The arrays are read-only, as
+    the same curve is handed to every caller.
+
+    name           scipy.stats distribution name
+    params         its keyword arguments
+    x              (n,) grid over the requested range
+    pdf, cdf       (n,) density and cumulative probability at x
+    probabilities  (k,) probabilities with a tabulated quantile
+    quantiles      (k,) the values below which those probabilities fall
+    """
+
+    def __init__(self, name, params, x, pdf, cdf, probabilities, quantiles):
+        self.name = name
+        self.params = dict(params)
+        self.x, self.pdf, self.cdf = x, pdf, cdf
+        self.probabilities, self.quantiles = probabilities, quantiles
+        for array in (x, pdf, cdf, probabilities, quantiles):
+            array.setflags(write=False)
+
+    @property
+    def distribution(self):
+        """The frozen scipy.stats distribution."""
+        return getattr(stats, self.name)(**self.params)
+
+    def quantile(self, probability):
+        """The quantile for probability, from the table when it is there."""
+        match = np.flatnonzero(np.isclose(self.probabilities, probability, rtol=0, atol=1e-12))
+        if match.size:
+            return float(self.quantiles[match[0]])
+        return float(self.distribution.ppf(probability))
+
+    def to_dict(self):
+        """Plain lists, for JSON (e.g. the data of an HTML interactive)."""
+        return {
+            'name': self.name,
+            'params': self.params,
+            'x': self.x.tolist(),
+            'pdf': self.pdf.tolist(),
+            'cdf': self.cdf.tolist(),
+            'quantiles': dict(zip((f"{p:g}" for p in self.probabilities),
+                                  self.quantiles.tolist())),
+        }
+
+
+def curve_key(name, x_range, points, probabilities, params):
+    """Hash of everything a curve's samples depend on."""
+    payload = json.dumps({
+        'version': CURVE_VERSION,
+        'scipy': scipy.__version__,
+        'name': name,
+        'params': {key: float(value) for key, value in sorted(params.items())},
+        'x_range': [float(value) for value in x_range],
+        'points': int(points),
+        'probabilities': [float(p) for p in probabilities],
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _compute(name, x_range, points, probabilities, params):
+    distribution = getattr(stats, name)(**params)
+    x = np.linspace(x_range[0], x_range[1], points)
+    probabilities = np.asarray(probabilities, dtype=float)
+    return {'x': x, 'pdf': distribution.pdf(x), 'cdf': distribution.cdf(x),
+            'probabilities': probabilities, 'quantiles': distribution.ppf(probabilities)}
+
+
+def _save(path, arrays):
+    """Write path atomically; a cache that can't be written is skipped."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez_compressed(tmp, **arrays)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def distribution_curve(name, x_range, points=DEFAULT_POINTS,
+                       probabilities=DEFAULT_PROBABILITIES, **params):
+    """
+    The DistributionCurve of scipy.stats distribution name with params,
+    sampled at points even steps over x_range (both ends included).
+    """
+    if not hasattr(stats, name):
+        raise ValueError(f"scipy.stats has no distribution {name!r}")
+    key = curve_key(name, x_range, points, probabilities, params)
+    if key in _memo:
+        return _memo[key]
+
+    path = CURVE_DIR / f"{name}-{key[:16]}.npz"
+    arrays = None
+    try:
+        with np.load(path) as data:
+            arrays = {field: data[field] for field in
+                      ('x', 'pdf', 'cdf', 'probabilities', 'quantiles')}
+    except (OSError, ValueError, KeyError):
+        pass
+    if arrays is None:
+        arrays = _compute(name, x_range, points, probabilities, params)
+        _save(path, arrays)
+
+    curve = _memo[key] = DistributionCurve(name, params, **arrays)
+    return curve
+
+
+def loc_for_probability(name, value, probability, **shape):
+    """
+    The loc that puts probability of distribution name (with its other
+    parameters in shape) below value. Exact for any location family:
+    value minus the quantile of the distribution at loc 0.
+    """
+    return float(value - getattr(stats, name).ppf(probability, **{**shape, 'loc': 0}))
+
+
+def write_json(path, curves):
+    """Write {label: curve.to_dict()} for curves (a dict of curves) to path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({label: curve.to_dict() for label, curve in curves.items()}),
+                    encoding='utf-8')
@@ -0,0 +1,152 @@
+"""
+Score Matching
+==============
+Nearest-neighbour matching of treated to control units on a scalar score
+(a propensity score), optionally within a caliper, for the causal
+inference chapters.
+
+The controls' scores are sorted once, and each treated unit's nearest
+controls are the two on either side of where its score would be inserted
+(np.searchsorted), so matching n_t treated units to n_c controls takes
+O((n_t + n_c) log n_c) rather than a scan of every control per treated
+unit. Ties in distance go to the control that comes first, as with
+Series.idxmin over the controls:
+
+    matches = match_on_score(df_obs, caliper=0.1)
+    matched = df_obs.loc[matches['control_idx']]
+"""
+
+import numpy as np
+import pandas as pd
+
+MATCH_COLUMNS = ['treated_idx', 'control_idx', 'ps_distance']
+
+
+def _first_of_run(sorted_scores, positions):
+    """The first sorted position holding the same score as each of positions."""
+    return np.searchsorted(sorted_scores, sorted_scores[positions], side='left')
+
+
+def _nearest_with_replacement(treated, sorted_scores, order):
+    n = len(sorted_scores)
+    right = np.searchsorted(sorted_scores, treated, side='left')
+    left = np.maximum(right - 1, 0)
+    right = np.minimum(right, n - 1)
+    left = _first_of_run(sorted_scores, left)
+
+    left_distance = np.abs(sorted_scores[left] - treated)
+    right_distance = np.abs(sorted_scores[right] - treated)
+    distance = np.minimum(left_distance, right_distance)
+
+    # Equal distances on both sides go to the control that comes first
+    position = np.where(left_distance < right_distance, left,
+                        np.where(right_distance < left_distance, right,
+                                 np.where(order[left] <= order[right], left, right)))
+
+    # Distinct scores can still round to the same distance as the nearest one
+    # (only on the far side of either neighbour); widen those rare ties so the
+    # first control among all of them wins
+    lo = np.where(left_distance == distance, left, right)
+    hi = np.where(right_distance == distance, right, left)
+    while True:
+        step = (lo > 0) & (np.abs(sorted_scores[lo - 1] - treated) == distance)
+        if not step.any():
+            break
+        lo = np.where(step, _first_of_run(sorted_scores, np.maximum(lo - 1, 0)), lo)
+    while True:
+        step = (hi < n - 1) & (np.abs(sorted_scores[np.minimum(hi + 1, n - 1)] - treated) == distance)
+        if not step.any():
+            break
+        hi = np.where(step, hi + 1, hi)
+    for k in np.flatnonzero(hi - lo > 1):
+        span = np.arange(lo[k], hi[k] + 1)
+        span = span[np.abs(sorted_scores[span] - treated[k]) == distance[k]]
+        position[k] = span[np.argmin(order[span])]
+
+    return order[position], distance
+
+
+def _nearest_without_replacement(treated, sorted_scores, order, caliper):
+    n = len(sorted_scores)
+    # Skip pointers over used controls: next_free[i] is the first free sorted
+    # position >= i (n if none), prev_free[i + 1] the last free one <= i (-1 if none)
+    next_free = np.arange(n + 1)
+    prev_free = np.arange(-1, n)
+
+    def find(pointers, i, offset):
+        root = i
+        while pointers[root + offset] != root:
+            root = pointers[root + offset]
+        while pointers[i + offset] != root:
+            pointers[i + offset], i = root, pointers[i + offset]
+        return root
+
+    inserts = np.searchsorted(sorted_scores, treated, side='left')
+    positions = np.full(len(treated), -1)
+    distances = np.full(len(treated), np.nan)
+    for k, (score, insert) in enumerate(zip(treated, inserts)):
+        candidates = []
+        left = find(prev_free, insert - 1, 1)
+        if left >= 0:
+            # The first free control with the same score
+            candidates.append(find(next_free, int(_first_of_run(sorted_scores, left)), 0))
+        right = find(next_free, insert, 0)
+        if right < n:
+            candidates.append(right)
+        if not candidates:
+            break
+        best = min(candidates, key=lambda i: (abs(sorted_scores[i] - score), order[i]))
+        distance = abs(sorted_scores[best] - score)
+        if caliper is not None and distance > caliper:
+            continue
+        positions[k], distances[k] = order[best], distance
+        next_free[best] = best + 1
+        prev_free[best + 1] = best - 1
+    return positions, distances
+
+
+def nearest_within_caliper(treated_scores, control_scores, caliper=None, replace=True):
+    """
+    For each treated score, the position in control_scores of the nearest
+    control (-1 if none is within caliper) and its distance (NaN then).
+
+    With replace=False each control is used at most once: treated units
+    are matched in the order given, each to the nearest control not yet
+    used (greedy matching), so the result depends on that order.
+    """
+    treated = np.asarray(treated_scores, dtype=float)
+    controls = np.asarray(control_scores, dtype=float)
+    if not len(treated) or not len(controls):
+        return np.full(len(treated), -1), np.full(len(treated), np.nan)
+    order = np.argsort(controls, kind='stable')
+    sorted_scores = controls[order]
+
+    if not replace:
+        return _nearest_without_replacement(treated, sorted_scores, order, caliper)
+    positions, distances = _nearest_with_replacement(treated, sorted_scores, order)
+    if caliper is not None:
+        outside = distances > caliper
+        positions[outside], distances[outside] = -1, np.nan
+    return positions, distances
+
+
+def match_on_score(df, caliper=None, treatment='treat', score='propensity_score', replace=True):
+    """
+    Match each treated row of df (treatment == 1) to the control row
+    (treatment == 0) with the nearest score, within caliper if given.
+    Returns one row per matched treated unit, in the order of df, with
+    the index labels of both rows and the distance between their scores
+    (columns treated_idx, control_idx, ps_distance).
+    """
+    is_treated = (df[treatment] == 1).to_numpy()
+    is_control = (df[treatment] == 0).to_numpy()
+    scores = df[score].to_numpy(dtype=float)
+    positions, distances = nearest_within_caliper(
+        scores[is_treated], scores[is_control], caliper, replace)
+
+    matched = positions >= 0
+    return pd.DataFrame({
+        'treated_idx': df.index[is_treated][matched],
+        'control_idx': df.index[is_control][positions[matched]],
+        'ps_distance': distances[matched],
+    }, columns=MATCH_COLUMNS)
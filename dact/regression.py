@@ -0,0 +1,144 @@
+"""
+Regression Lines
+================
+Least squares arithmetic for the regression chapters and animations:
+the OLS line, and the fitted values, residuals and sum of squared
+residuals (SSR) of any number of candidate lines at once.
+"""
+
+import numpy as np
+
+
+def ols_line(x, y):
+    """Slope and intercept of the least squares line of y on x."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    dx = x - x.mean()
+    slope = float(np.dot(dx, y - y.mean()) / np.dot(dx, dx))
+    return slope, float(y.mean() - slope * x.mean())
+
+
+class LineFits:
+    """
+    How k candidate lines fit the points (x, y), computed in one batch.
+
+    x, y        (n,) the data
+    slopes      (k,) slope of each line
+    intercepts  (k,) intercept of each line
+    fitted      (k, n) each line's fitted value at each x
+    residuals   (k, n) y minus fitted
+    ssr         (k,) sum of squared residuals of each line
+    """
+
+    def __init__(self, x, y, slopes, intercepts):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.slopes = np.atleast_1d(np.asarray(slopes, dtype=float))
+        self.intercepts = np.atleast_1d(np.asarray(intercepts, dtype=float))
+        self.fitted = self.intercepts[:, None] + self.slopes[:, None] * self.x
+        self.residuals = self.y - self.fitted
+        self.ssr = np.einsum('kn,kn->k', self.residuals, self.residuals)
+
+    @classmethod
+    def from_lines(cls, x, y, lines):
+        """LineFits for a sequence of (slope, intercept) pairs."""
+        lines = np.asarray(lines, dtype=float).reshape(-1, 2)
+        return cls(x, y, lines[:, 0], lines[:, 1])
+
+    def __len__(self):
+        return len(self.slopes)
+
+
+def _sums(x, y):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    return len(x), x.sum(), y.sum(), x @ x, x @ y, y @ y
+
+
+def ssr_surface(x, y, slopes, intercepts):
+    """
+    SSR of the line with each slope and intercept (arrays broadcast against
+    each other, e.g. a meshgrid), from the sums of squares and cross
+    products of the data rather than from its residuals.
+    """
+    n, sx, sy, sxx, sxy, syy = _sums(x, y)
+    b = np.asarray(slopes, dtype=float)
+    a = np.asarray(intercepts, dtype=float)
+    return (syy + n * a**2 + sxx * b**2
+            + 2 * (a * b * sx - a * sy - b * sxy))
+
+
+def ssr_gradient(x, y, slope, intercept):
+    """Derivatives of SSR with respect to slope and intercept."""
+    n, sx, sy, sxx, sxy, _ = _sums(x, y)
+    return (2 * (slope * sxx + intercept * sx - sxy),
+            2 * (slope * sx + intercept * n - sy))
+
+
+def _hessian(x, y):
+    n, sx, _, sxx, _, _ = _sums(x, y)
+    return 2 * np.array([[sxx, sx], [sx, n]])
+
+
+def gradient_descent(x, y, start, steps=300, learning_rate=None, tolerance=1e-9):
+    """
+    Gradient descent on SSR from start = (slope, intercept), as an (m, 2)
+    array of (slope, intercept) with start first and a row per step. Stops
+    after steps steps or once a step moves less than tolerance.
+
+    Unless x is centred, SSR is a long narrow valley: the path falls onto
+    the valley floor in a few steps and then creeps along it. The default
+    learning rate, 1.8 over the largest eigenvalue of SSR's Hessian, is a
+    little under the largest that converges (2 over it), so the path
+    creeps as fast as it can while the zig-zag across the valley dies out
+    within a few dozen steps.
+    """
+    hessian = _hessian(x, y)
+    if learning_rate is None:
+        learning_rate = 1.8 / np.linalg.eigvalsh(hessian)[-1]
+    gradient_at_zero = np.array(ssr_gradient(x, y, 0.0, 0.0))
+
+    path = np.empty((steps + 1, 2))
+    path[0] = start
+    for k in range(steps):
+        # SSR is quadratic: its gradient is linear in (slope, intercept)
+        step = learning_rate * (hessian @ path[k] + gradient_at_zero)
+        path[k + 1] = path[k] - step
+        if np.hypot(*step) < tolerance:
+            return path[:k + 2]
+    return path
+
+
+def coordinate_descent(x, y, start, steps=20):
+    """
+    Coordinate search on SSR from start = (slope, intercept): each step
+    sets the intercept to the best one for the current slope, then the
+    slope to the best one for that intercept. An (m, 2) array of
+    (slope, intercept) with start first and a row per half step, so the
+    path moves along one axis at a time.
+    """
+    n, sx, sy, sxx, sxy, _ = _sums(x, y)
+    path = [tuple(start)]
+    slope, intercept = start
+    for _ in range(steps):
+        intercept = (sy - slope * sx) / n
+        path.append((slope, intercept))
+        slope = (sxy - intercept * sx) / sxx
+        path.append((slope, intercept))
+    return np.array(path, dtype=float)
+
+
+def ssr_contour(x, y, level, points=200):
+    """
+    The lines whose SSR equals level, as a closed (points, 2) array of
+    (slope, intercept). SSR is quadratic in the two, so each contour is
+    an ellipse around the OLS line, traced here exactly.
+    """
+    best = np.array(ols_line(x, y))
+    excess = level - ssr_surface(x, y, *best)
+    if excess < 0:
+        raise ValueError(f"SSR level {level} is below its minimum {level - excess}")
+    eigenvalues, eigenvectors = np.linalg.eigh(_hessian(x, y) / 2)
+    angle = np.linspace(0, 2 * np.pi, points)
+    circle = np.stack([np.cos(angle), np.sin(angle)])
+    return best + (eigenvectors @ (np.sqrt(excess / eigenvalues)[:, None] * circle)).T
@@ -1,6 +1,11 @@
 from manim import *
 import numpy as np
 
+from dact.anim.axes import axes_points
+from dact.anim.labels import markup_label, text_label
+from dact.anim.residuals import ResidualGeometry
+from dact.regression import LineFits, gradient_descent, ols_line, ssr_contour
+
 class LeastSquares(Scene):
     def construct(self):
         # Set background to black
@@ -25,10 +30,7 @@ class LeastSquares(Scene):
         Y = true_intercept + true_slope * X + noise
         
         # Calculate OLS estimators
-        X_mean = np.mean(X)
-        Y_mean = np.mean(Y)
-        slope_ols = np.sum((X - X_mean) * (Y - Y_mean)) / np.sum((X - X_mean)**2)
-        intercept_ols = Y_mean - slope_ols * X_mean
+        slope_ols, intercept_ols = ols_line(X, Y)
         
         # Trial parameters
         trials = [
@@ -39,8 +41,11 @@ class LeastSquares(Scene):
             (slope_ols, intercept_ols)  # Optimal
         ]
         
+        # Residuals and SSR of every trial line at once
+        fits = LineFits.from_lines(X, Y, trials)
+        
         # Opening title - fade in at center with Sather Gate and Latin Modern Roman
-        opening_title = Text("Least Squares Estimation", color=SATHER_GATE, weight=BOLD, font="Latin Modern Roman").scale(0.7)
+        opening_title = text_label("Least Squares Estimation", color=SATHER_GATE, weight=BOLD, font="Latin Modern Roman", scale=0.7)
         opening_title.move_to(ORIGIN)
         self.play(FadeIn(opening_title, run_time=2.0))
         self.wait(1.5)
@@ -48,17 +53,17 @@ class LeastSquares(Scene):
         self.wait(0.5)
         
         # Copyright (Sather Gate color)
-        copyright_text = Text("© 2025 Gautam Sethi", color=SATHER_GATE, font="Latin Modern Roman").scale(0.22)
+        copyright_text = text_label("© 2025 Gautam Sethi", color=SATHER_GATE, font="Latin Modern Roman", scale=0.22)
         copyright_text.to_corner(DR, buff=0.2)
         self.play(FadeIn(copyright_text, run_time=1.0))
         
         # Create data table on the right side with Golden Gate color (lighter)
-        table_title = Text("Data", color=ROSE_GARDEN, font="Latin Modern Roman", weight=BOLD).scale(0.35)
+        table_title = text_label("Data", color=ROSE_GARDEN, font="Latin Modern Roman", weight=BOLD, scale=0.35)
         table_title.move_to([4.5, 2.5, 0])
         
         # Table headers
-        header_x = Text("X", color=ROSE_GARDEN, font="Latin Modern Roman", slant=ITALIC).scale(0.3)
-        header_y = Text("Y", color=ROSE_GARDEN, font="Latin Modern Roman", slant=ITALIC).scale(0.3)
+        header_x = text_label("X", color=ROSE_GARDEN, font="Latin Modern Roman", slant=ITALIC, scale=0.3)
+        header_y = text_label("Y", color=ROSE_GARDEN, font="Latin Modern Roman", slant=ITALIC, scale=0.3)
         header_x.move_to([3.8, 2.0, 0])
         header_y.move_to([5.2, 2.0, 0])
         
@@ -75,8 +80,8 @@ class LeastSquares(Scene):
         row_spacing = 0.27  # Reduced from 0.30 to fit all rows
         
         for i in range(n):
-            x_cell = Text(f"{X[i]:.1f}", color=ROSE_GARDEN, font="Latin Modern Roman").scale(0.3)
-            y_cell = Text(f"{Y[i]:.1f}", color=ROSE_GARDEN, font="Latin Modern Roman").scale(0.3)
+            x_cell = text_label(f"{X[i]:.1f}", color=ROSE_GARDEN, font="Latin Modern Roman", scale=0.3)
+            y_cell = text_label(f"{Y[i]:.1f}", color=ROSE_GARDEN, font="Latin Modern Roman", scale=0.3)
             
             row_y = row_y_start - i * row_spacing
             x_cell.move_to([3.8, row_y, 0])
@@ -104,11 +109,11 @@ class LeastSquares(Scene):
         
         # Axis labels manually
         x_tick_labels = VGroup(*[
-            Text(str(i), color=WHITE, font="Latin Modern Roman").scale(0.25).next_to(axes.c2p(i, 0), DOWN, buff=0.15)
+            text_label(str(i), color=WHITE, font="Latin Modern Roman", scale=0.25).next_to(axes.c2p(i, 0), DOWN, buff=0.15)
             for i in range(0, 13, 2)
         ])
         y_tick_labels = VGroup(*[
-            Text(str(i), color=WHITE, font="Latin Modern Roman").scale(0.25).next_to(axes.c2p(0, i), LEFT, buff=0.15)
+            text_label(str(i), color=WHITE, font="Latin Modern Roman", scale=0.25).next_to(axes.c2p(0, i), LEFT, buff=0.15)
             for i in range(0, 40, 5)
         ])
         
@@ -123,9 +128,9 @@ class LeastSquares(Scene):
         ])
         
         # X label below the X-axis
-        x_label = Text("X", color=WHITE, slant=ITALIC, font="Latin Modern Roman").scale(0.5).next_to(axes.x_axis, DOWN, buff=0.4)
+        x_label = text_label("X", color=WHITE, slant=ITALIC, font="Latin Modern Roman", scale=0.5).next_to(axes.x_axis, DOWN, buff=0.4)
         # Y label on the side of Y-axis
-        y_label = Text("Y", color=WHITE, slant=ITALIC, font="Latin Modern Roman").scale(0.5).next_to(axes.y_axis, LEFT, buff=0.4)
+        y_label = text_label("Y", color=WHITE, slant=ITALIC, font="Latin Modern Roman", scale=0.5).next_to(axes.y_axis, LEFT, buff=0.4)
         
         # Draw X-axis from left to right (wipe)
         self.play(Create(axes.x_axis, run_time=2.0))
@@ -185,8 +190,8 @@ class LeastSquares(Scene):
         col3_x = table_x_base + column_width
         
         # Table header for first two columns only (initially) - LAWRENCE (blue)
-        header1 = Text("Intercept", color=LAWRENCE, font="Latin Modern Roman").scale(0.3).move_to([col1_x, table_y_base, 0])
-        header2 = Text("Slope", color=LAWRENCE, font="Latin Modern Roman").scale(0.3).move_to([col2_x, table_y_base, 0])
+        header1 = text_label("Intercept", color=LAWRENCE, font="Latin Modern Roman", scale=0.3).move_to([col1_x, table_y_base, 0])
+        header2 = text_label("Slope", color=LAWRENCE, font="Latin Modern Roman", scale=0.3).move_to([col2_x, table_y_base, 0])
         
         header_line_partial = Line(
             [col1_x - 0.5, table_y_base - 0.2, 0],
@@ -198,7 +203,7 @@ class LeastSquares(Scene):
         table_header_partial = VGroup(header1, header2, header_line_partial)
         
         # SSR header (to be added later) - CALIFORNIA_GOLD
-        header3 = Text("SSR", color=CALIFORNIA_GOLD, font="Latin Modern Roman").scale(0.3).move_to([col3_x, table_y_base, 0])
+        header3 = text_label("SSR", color=CALIFORNIA_GOLD, font="Latin Modern Roman", scale=0.3).move_to([col3_x, table_y_base, 0])
         
         # Create line function (LAWRENCE - blue)
         def create_line(slope, intercept):
@@ -207,46 +212,8 @@ class LeastSquares(Scene):
             y_end = intercept + slope * x_end
             return Line(axes.c2p(x_start, y_start), axes.c2p(x_end, y_end), color=LAWRENCE, stroke_width=3)
         
-        # Create residuals function (CALIFORNIA_GOLD with MEDALIST outlines)
-        def create_residuals(slope, intercept):
-            solid_lines = VGroup()
-            squares = VGroup()
-            ssr = 0
-            
-            for i in range(n):
-                y_pred = intercept + slope * X[i]
-                residual = Y[i] - y_pred
-                ssr += residual**2
-                
-                point_on_data = axes.c2p(X[i], Y[i])
-                point_on_line = axes.c2p(X[i], y_pred)
-                
-                # Solid CALIFORNIA_GOLD line
-                solid_line = Line(point_on_data, point_on_line, color=CALIFORNIA_GOLD, stroke_width=2)
-                solid_lines.add(solid_line)
-                
-                side_length = abs(axes.c2p(0, residual)[1] - axes.c2p(0, 0)[1])
-                
-                if residual > 0:
-                    corner1, corner2 = point_on_line, point_on_data
-                    corner3 = point_on_data + LEFT * side_length
-                    corner4 = point_on_line + LEFT * side_length
-                else:
-                    corner1, corner2 = point_on_line, point_on_data
-                    corner3 = point_on_data + RIGHT * side_length
-                    corner4 = point_on_line + RIGHT * side_length
-                
-                # CALIFORNIA_GOLD squares with MEDALIST (darker) outlines for better visibility
-                square = Polygon(
-                    corner1, corner2, corner3, corner4, 
-                    stroke_width=2, 
-                    stroke_color=MEDALIST,  # Darker outline
-                    fill_color=CALIFORNIA_GOLD, 
-                    fill_opacity=0.8  # Slightly transparent to see overlaps
-                )
-                squares.add(square)
-            
-            return solid_lines, squares, ssr
+        # Residual segments and squares of every trial line (CALIFORNIA_GOLD with MEDALIST outlines)
+        residuals = ResidualGeometry(axes, fits)
         
         # Store objects
         current_line = None
@@ -256,14 +223,16 @@ class LeastSquares(Scene):
         
         # Iterate through trials
         for trial_num, (slope, intercept) in enumerate(trials):
+            # One section per trial: render-animations.py renders them in parallel
+            self.next_section(f"Trial {trial_num + 1}")
             is_optimal = (trial_num == len(trials) - 1)
             
             # Calculate row y-position
             row_y = table_y_base - 0.6 - (trial_num * 0.35)
             
             # Create table cells for this row (first two columns in LAWRENCE)
-            cell1 = Text(f"{intercept:.1f}", color=LAWRENCE, font="Latin Modern Roman").scale(0.3).move_to([col1_x, row_y, 0])
-            cell2 = Text(f"{slope:.2f}", color=LAWRENCE, font="Latin Modern Roman").scale(0.3).move_to([col2_x, row_y, 0])
+            cell1 = text_label(f"{intercept:.1f}", color=LAWRENCE, font="Latin Modern Roman", scale=0.3).move_to([col1_x, row_y, 0])
+            cell2 = text_label(f"{slope:.2f}", color=LAWRENCE, font="Latin Modern Roman", scale=0.3).move_to([col2_x, row_y, 0])
             
             # Show table header on first iteration, then just the cells
             if trial_num == 0:
@@ -282,11 +251,12 @@ class LeastSquares(Scene):
             self.play(Create(current_line, run_time=2.0))
             
             # Create equation next to line (LAWRENCE with italicized variables) - smaller size
-            current_equation = MarkupText(
+            current_equation = markup_label(
                 f"<i>Ŷ</i> = {intercept:.1f} + {slope:.2f}<i>X</i>",
                 color=LAWRENCE,
-                font="Latin Modern Roman"
-            ).scale(0.3)
+                font="Latin Modern Roman",
+                scale=0.3
+            )
             line_end_y = intercept + slope * 12
             line_end_point = axes.c2p(12, line_end_y)
             current_equation.next_to(line_end_point, RIGHT, buff=0.2)
@@ -295,10 +265,18 @@ class LeastSquares(Scene):
             self.wait(0.5)
             
             # Create residuals
-            solid_lines, squares, ssr = create_residuals(slope, intercept)
+            solid_lines = residuals.lines(trial_num, color=CALIFORNIA_GOLD, stroke_width=2)
+            squares = residuals.squares(
+                trial_num,
+                stroke_width=2,
+                stroke_color=MEDALIST,  # Darker outline
+                fill_color=CALIFORNIA_GOLD,
+                fill_opacity=0.8  # Slightly transparent to see overlaps
+            )
+            ssr = fits.ssr[trial_num]
             
             # Step 1: Show "Residuals" title (CALIFORNIA_GOLD) at top and animate residual lines
-            title1 = Text("Residuals", color=CALIFORNIA_GOLD, font="Latin Modern Roman").scale(0.4)
+            title1 = text_label("Residuals", color=CALIFORNIA_GOLD, font="Latin Modern Roman", scale=0.4)
             title1.to_edge(UP, buff=0.3)
             
             if trial_num == 0:
@@ -311,7 +289,7 @@ class LeastSquares(Scene):
             self.wait(0.5)
             
             # Step 2: Transition to "Squared residuals" (CALIFORNIA_GOLD) and show squares
-            title2 = Text("Squared residuals", color=CALIFORNIA_GOLD, font="Latin Modern Roman").scale(0.4)
+            title2 = text_label("Squared residuals", color=CALIFORNIA_GOLD, font="Latin Modern Roman", scale=0.4)
             title2.to_edge(UP, buff=0.3)
             
             self.play(Transform(current_title, title2), run_time=0.8)
@@ -334,10 +312,10 @@ class LeastSquares(Scene):
                 ssr_header_shown = True
             
             # Create SSR value cell (CALIFORNIA_GOLD)
-            cell3 = Text(f"{ssr:.1f}", color=CALIFORNIA_GOLD, font="Latin Modern Roman").scale(0.3).move_to([col3_x, row_y, 0])
+            cell3 = text_label(f"{ssr:.1f}", color=CALIFORNIA_GOLD, font="Latin Modern Roman", scale=0.3).move_to([col3_x, row_y, 0])
             
             # Transition title to full text with SSR value (CALIFORNIA_GOLD)
-            title3 = Text(f"Sum of squared residuals (SSR) = {ssr:.1f}", color=CALIFORNIA_GOLD, font="Latin Modern Roman").scale(0.4)
+            title3 = text_label(f"Sum of squared residuals (SSR) = {ssr:.1f}", color=CALIFORNIA_GOLD, font="Latin Modern Roman", scale=0.4)
             title3.to_edge(UP, buff=0.3)
             
             self.play(
@@ -372,11 +350,12 @@ class LeastSquares(Scene):
                 #self.wait(0.5)
                 
                 # Create final title with the regression equation
-                final_title = MarkupText(
+                final_title = markup_label(
                     f"Least squares regression line",
                     color=LAWRENCE,
-                    font="Latin Modern Roman"
-                ).scale(0.4)
+                    font="Latin Modern Roman",
+                    scale=0.4
+                )
                 final_title.to_edge(UP, buff=0.3)
                 
                 self.play(FadeIn(final_title, run_time=2.0))
@@ -384,11 +363,164 @@ class LeastSquares(Scene):
         
         self.wait(3)
 
-if __name__ == "__main__":
-    from manim import config
-    config.pixel_height = 1080
-    config.pixel_width = 1920
-    config.frame_height = 8.0
-    config.frame_width = 14.0
-    config.frame_rate = 30
-    config.output_file = "LeastSquares.mp4"
\ No newline at end of file
+
+class LeastSquaresDescent(Scene):
+    """
+    The LeastSquares data fitted by gradient descent on SSR. The whole path
+    is computed before anything is drawn, and one updater moves the line,
+    its residuals and the path over the SSR contours as a single tracker
+    runs through the steps.
+    """
+    def construct(self):
+        self.camera.background_color = BLACK
+        
+        # Cal colors (as in LeastSquares)
+        CALIFORNIA_GOLD = "#FDB515"  # For residuals, SSR and its contours
+        LAWRENCE = "#00B0DA"  # For the line and its path
+        SATHER_GATE = "#C4CDB5"  # For title, copyright
+        GOLDEN_GATE = "#EE1F60"  # For scatter points
+        MEDALIST = "#C4820E"  # For square outlines
+        
+        # Same data as LeastSquares
+        np.random.seed(42)
+        n = 12
+        X = np.linspace(1, 10, n)
+        true_slope = 2.3
+        true_intercept = 5
+        noise = np.random.normal(0, 3, n)
+        Y = true_intercept + true_slope * X + noise
+        slope_ols, intercept_ols = ols_line(X, Y)
+        
+        # The whole descent, from a nearly flat line above the data
+        path = gradient_descent(X, Y, start=(0.5, 20.0), steps=400)
+        last = len(path) - 1
+        fits = LineFits(X, Y, path[:, 0], path[:, 1])
+        
+        title = text_label("Gradient descent on the sum of squared residuals", color=SATHER_GATE, weight=BOLD, font="Latin Modern Roman", scale=0.45)
+        title.to_edge(UP, buff=0.3)
+        copyright_text = text_label("© 2025 Gautam Sethi", color=SATHER_GATE, font="Latin Modern Roman", scale=0.22)
+        copyright_text.to_corner(DR, buff=0.2)
+        self.play(FadeIn(title, run_time=1.5), FadeIn(copyright_text, run_time=1.0))
+        
+        # Data and fitted line (left)
+        axes = Axes(
+            x_range=[0, 12, 2],
+            y_range=[0, 35, 5],
+            x_length=6,
+            y_length=4.5,
+            axis_config={"color": WHITE, "stroke_width": 2, "include_ticks": False},
+            tips=False,
+        )
+        axes.shift(LEFT * 3.4 + DOWN * 0.4)
+        x_label = text_label("X", color=WHITE, slant=ITALIC, font="Latin Modern Roman", scale=0.45).next_to(axes.x_axis, DOWN, buff=0.3)
+        y_label = text_label("Y", color=WHITE, slant=ITALIC, font="Latin Modern Roman", scale=0.45).next_to(axes.y_axis, LEFT, buff=0.3)
+        dots = VGroup(*[Dot(point, color=GOLDEN_GATE, radius=0.04) for point in axes_points(axes, X, Y)])
+        
+        # SSR contours over intercept and slope (right)
+        ssr_axes = Axes(
+            x_range=[-4, 24, 4],
+            y_range=[-1, 4, 1],
+            x_length=4.8,
+            y_length=4.5,
+            axis_config={"color": WHITE, "stroke_width": 1.5, "include_ticks": False},
+            tips=False,
+        )
+        ssr_axes.shift(RIGHT * 3.6 + DOWN * 0.4)
+        intercept_label = text_label("Intercept", color=LAWRENCE, font="Latin Modern Roman", scale=0.3).next_to(ssr_axes, DOWN, buff=0.3)
+        slope_label = text_label("Slope", color=LAWRENCE, font="Latin Modern Roman", scale=0.3).rotate(PI / 2).next_to(ssr_axes, LEFT, buff=0.3)
+        ssr_ticks = VGroup(
+            *[text_label(str(i), color=WHITE, font="Latin Modern Roman", scale=0.22).next_to(ssr_axes.c2p(i, 0), DOWN, buff=0.1)
+              for i in (10, 20)],
+            *[text_label(str(i), color=WHITE, font="Latin Modern Roman", scale=0.22).next_to(ssr_axes.c2p(0, i), LEFT, buff=0.1)
+              for i in (1, 2, 3)],
+        )
+        
+        # Contours are exact ellipses; the inner ones brighter
+        levels = (55, 80, 130, 200, 300)
+        contours = VGroup()
+        for level, opacity in zip(levels, np.linspace(1.0, 0.35, len(levels))):
+            contour = ssr_contour(X, Y, level)
+            contours.add(VMobject(stroke_color=CALIFORNIA_GOLD, stroke_width=1.5, stroke_opacity=opacity)
+                         .set_points_as_corners(axes_points(ssr_axes, contour[:, 1], contour[:, 0])))
+        minimum = Dot(ssr_axes.c2p(intercept_ols, slope_ols), color=CALIFORNIA_GOLD, radius=0.05)
+        
+        self.play(Create(axes, run_time=1.5), Create(ssr_axes, run_time=1.5))
+        self.play(
+            FadeIn(x_label), FadeIn(y_label), FadeIn(intercept_label), FadeIn(slope_label), FadeIn(ssr_ticks),
+            LaggedStart(*[GrowFromCenter(dot) for dot in dots], lag_ratio=0.1, run_time=1.5),
+        )
+        self.play(LaggedStart(*[Create(contour) for contour in contours], lag_ratio=0.2, run_time=2.0), FadeIn(minimum))
+        self.wait(0.5)
+        
+        # Scene positions of everything that moves, for every step of the path
+        residuals = ResidualGeometry(axes, fits)
+        line_ends = axes_points(
+            axes, np.broadcast_to([0, 12], (len(path), 2)), path[:, 1:] + path[:, :1] * [0, 12]
+        ).reshape(-1, 2, 3)
+        markers = axes_points(ssr_axes, path[:, 1], path[:, 0])
+        
+        line = Line(*line_ends[0], color=LAWRENCE, stroke_width=3)
+        solid_lines = residuals.lines(0, color=CALIFORNIA_GOLD, stroke_width=2)
+        squares = residuals.squares(0, stroke_width=1.5, stroke_color=MEDALIST, fill_color=CALIFORNIA_GOLD, fill_opacity=0.5)
+        trail = VMobject(stroke_color=LAWRENCE, stroke_width=2).set_points_as_corners(markers[[0, 0]])
+        marker = Dot(markers[0], color=LAWRENCE, radius=0.06)
+        
+        # Readouts above the contours
+        ssr_text = text_label("SSR", color=CALIFORNIA_GOLD, font="Latin Modern Roman", scale=0.35)
+        ssr_value = DecimalNumber(fits.ssr[0], num_decimal_places=1, color=CALIFORNIA_GOLD, font_size=26)
+        step_text = text_label("Step", color=LAWRENCE, font="Latin Modern Roman", scale=0.35)
+        step_value = Integer(0, color=LAWRENCE, font_size=26)
+        readouts = VGroup(
+            VGroup(step_text, step_value).arrange(RIGHT, buff=0.15),
+            VGroup(ssr_text, ssr_value).arrange(RIGHT, buff=0.15),
+        ).arrange(RIGHT, buff=0.6)
+        readouts.next_to(ssr_axes, UP, buff=0.25)
+        
+        self.play(
+            Create(line, run_time=1.0),
+            LaggedStart(*[Create(sl) for sl in solid_lines], lag_ratio=0.1, run_time=1.5),
+            LaggedStart(*[DrawBorderThenFill(sq) for sq in squares], lag_ratio=0.1, run_time=2.0),
+            FadeIn(marker), FadeIn(readouts),
+        )
+        self.add(trail)
+        self.wait(0.5)
+        
+        # One updater plays the whole path: it redraws only when the step changes
+        step = ValueTracker(0)
+        shown = 0
+        
+        def follow_path(group):
+            nonlocal shown
+            k = min(int(step.get_value()), last)
+            if k == shown:
+                return
+            shown = k
+            line.put_start_and_end_on(*line_ends[k])
+            residuals.update(k, solid_lines, squares)
+            trail.set_points_as_corners(markers[:k + 1])
+            marker.move_to(markers[k])
+            ssr_value.set_value(fits.ssr[k])
+            step_value.set_value(k)
+        
+        descent = VGroup(line, solid_lines, squares, trail, marker, ssr_value, step_value)
+        descent.add_updater(follow_path)
+        self.add(descent)
+        
+        # The first steps slowly (they zig-zag across the valley), then the long creep along it
+        self.play(step.animate.set_value(30), run_time=6.0, rate_func=linear)
+        self.play(step.animate.set_value(last), run_time=10.0, rate_func=smooth)
+        descent.clear_updaters()
+        self.wait(1.0)
+        
+        # Finish on the least squares line itself
+        ols_line_mob = Line(axes.c2p(0, intercept_ols), axes.c2p(12, intercept_ols + slope_ols * 12), color=LAWRENCE, stroke_width=3)
+        final_title = markup_label("Least squares regression line", color=LAWRENCE, font="Latin Modern Roman", scale=0.4)
+        final_title.to_edge(UP, buff=0.3)
+        self.play(
+            FadeOut(solid_lines, run_time=1.0),
+            FadeOut(squares, run_time=1.0),
+            Transform(line, ols_line_mob, run_time=1.0),
+            marker.animate.move_to(minimum),
+            Transform(title, final_title, run_time=1.5),
+        )
+        self.wait(3)
@@ -14,6 +14,8 @@ from manim import *
 import numpy as np
 import random
 
+from galton_sim import GaltonSimulation
+
 # UC Berkeley Pastel Color Palette
 BERKELEY_COLORS = {
     'berkeley_blue': '#003262',      # Primary blue
@@ -28,10 +30,8 @@ BERKELEY_COLORS = {
     'powder_blue': '#A8C8E1',       # Powder blue
 }
 
-# Configuration
-config.pixel_height = 1080
-config.pixel_width = 1920
-config.frame_rate = 60
+# Resolution and frame rate come from the render profile
+# (scripts/render-animations.py)
 config.background_color = "#FAFAFA"  # Very light gray background
 
 class GaltonBoardScene(Scene):
@@ -43,6 +43,7 @@ class GaltonBoardScene(Scene):
         self.peg_spacing = 0.5
         self.ball_radius = 0.08
         self.n_balls = 200  # Total number of balls to drop
+        self.simulation = GaltonSimulation(self.n_balls, self.n_rows)
         self.bins = []
         
         # Create title
@@ -166,6 +167,15 @@ class GaltonBoardScene(Scene):
         
         balls_group = VGroup()
         
+        # Every ball's path, ending stacked in its bin
+        paths = self.simulation.paths(
+            start_y=3.5,
+            row_ys=3.5 - np.arange(1, self.n_rows + 1) * self.peg_spacing,
+            spacing=self.peg_spacing,
+            floor_y=self.bins[0]['bottom_y'],
+            pitch=self.ball_radius * 2
+        )
+        
         # Drop balls in batches for efficiency
         batch_size = 5
         n_batches = self.n_balls // batch_size
@@ -186,11 +196,8 @@ class GaltonBoardScene(Scene):
                 )
                 balls_group.add(ball)
                 
-                # Calculate path
-                path = self.calculate_ball_path()
-                
                 # Create movement animation
-                animation = self.create_ball_drop_animation(ball, path)
+                animation = self.create_ball_drop_animation(ball, paths[ball_idx])
                 batch_animations.append(animation)
             
             # Play batch animations with slight delay between them
@@ -200,57 +207,16 @@ class GaltonBoardScene(Scene):
                 rate_func=linear
             )
         
+        for bin_info, count in zip(self.bins, self.simulation.counts):
+            bin_info['count'] = int(count)
         self.wait(1)
     
-    def calculate_ball_path(self):
-        """Calculate a random path for a ball through the pegs."""
-        x = 0
-        y = 3.5
-        path = [[x, y, 0]]
-        
-        for row in range(self.n_rows):
-            # Randomly go left or right (Bernoulli trial)
-            direction = random.choice([-1, 1])
-            x += direction * self.peg_spacing / 2
-            y -= self.peg_spacing
-            
-            path.append([x, y, 0])
-        
-        # Determine which bin this ball lands in
-        bin_index = self.determine_bin(x)
-        
-        # Add final position in the bin
-        bin_info = self.bins[bin_index]
-        final_y = bin_info['bottom_y'] + bin_info['count'] * (self.ball_radius * 2)
-        path.append([bin_info['x'], final_y, 0])
-        
-        # Update bin count
-        bin_info['count'] += 1
-        
-        return path
-    
-    def determine_bin(self, x_position):
-        """Determine which bin a ball lands in based on its x position."""
-        # Find closest bin
-        min_distance = float('inf')
-        closest_bin = 0
-        
-        for i, bin_info in enumerate(self.bins):
-            distance = abs(x_position - bin_info['x'])
-            if distance < min_distance:
-                min_distance = distance
-                closest_bin = i
-        
-        return closest_bin
-    
     def create_ball_drop_animation(self, ball, path):
         """Create animation for a ball dropping through the path."""
-        points = [np.array(p) for p in path]
-        
         # Create path
         return Succession(
             FadeIn(ball, scale=0.5),
-            MoveAlongPath(ball, VMobject().set_points_as_corners(points)),
+            MoveAlongPath(ball, VMobject().set_points_as_corners(path)),
             lag_ratio=0.1
         )
 
@@ -260,10 +226,6 @@ class GaltonBoardSimple(Scene):
     
     def construct(self):
         # Similar to above but with fewer balls and simpler animations
-        config.pixel_height = 1080
-        config.pixel_width = 1920
-        config.frame_rate = 30  # Lower framerate for faster rendering
-        
         # Quick demonstration
         title = Text("Galton Board - Quick Demo", 
                     font="EB Garamond", 
@@ -288,7 +250,14 @@ class GaltonBoardSimple(Scene):
         self.play(Create(pegs), run_time=1.5)
         
         # Drop a few balls to show the concept
-        for _ in range(10):
+        paths = GaltonSimulation(10, n_rows).paths(
+            start_y=3,
+            row_ys=2 - np.arange(n_rows) * peg_spacing,
+            spacing=peg_spacing,
+            floor_y=-2.5,
+            pitch=0
+        )
+        for i in range(10):
             ball = Dot([0, 3, 0], 
                       radius=0.1, 
                       color=random.choice([
@@ -297,16 +266,7 @@ class GaltonBoardSimple(Scene):
                           BERKELEY_COLORS['peach']
                       ]))
             
-            # Random path
-            x = 0
-            path_points = [[0, 3, 0]]
-            for row in range(n_rows):
-                x += random.choice([-1, 1]) * peg_spacing / 2
-                y = 2 - row * peg_spacing
-                path_points.append([x, y, 0])
-            path_points.append([x, -2.5, 0])
-            
-            path = VMobject().set_points_as_corners([np.array(p) for p in path_points])
+            path = VMobject().set_points_as_corners(paths[i])
             
             self.play(
                 FadeIn(ball, scale=0.5),
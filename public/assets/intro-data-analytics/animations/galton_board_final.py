@@ -9,7 +9,8 @@ Used in: Chapter 1 - The Purpose of Data Analytics
 
 from manim import *
 import numpy as np
-import random
+
+from galton_sim import GaltonSimulation, positions_along
 
 # UC Berkeley Bright Color Palette (for contrast on black background)
 BERKELEY_COLORS = {
@@ -31,21 +32,37 @@ BERKELEY_COLORS = {
     'grey': '#888888',                 # Medium grey for copyright
 }
 
-# Configuration for 16:9 at 1920x1080
-config.pixel_height = 1080
-config.pixel_width = 1920
-config.frame_rate = 60
+# Ball colors, cycled in drop order
+BALL_COLORS = [
+    BERKELEY_COLORS['rose_garden'],    # Bright magenta
+    BERKELEY_COLORS['california_gold'], # Bright gold
+    BERKELEY_COLORS['golden_gate'],    # Bright red-orange
+    BERKELEY_COLORS['lawrence'],       # Bright cyan
+    BERKELEY_COLORS['lap_lane'],       # Bright teal
+    BERKELEY_COLORS['ion'],            # Bright yellow-green
+]
+
+# Resolution and frame rate come from the render profile
+# (scripts/render-animations.py)
 config.background_color = "#000000"  # Black background
 
 class GaltonBoard(Scene):
     """Galton board showing emergence of normal distribution from random events."""
     
+    # Parameters
+    n_rows = 12
+    peg_spacing = 0.5
+    ball_radius = 0.06
+    n_balls = 100  # Reduced for reasonable render time
+    
+    # Batched drop (see drop_balls_batched)
+    batched = False
+    drop_duration = 16    # Seconds from the first ball leaving to the last
+    fall_time = 1.2       # Seconds each ball takes to land
+    drop_window = 1.0     # Seconds between merges of landed balls into the pile
+    
     def construct(self):
-        # Parameters
-        self.n_rows = 12
-        self.peg_spacing = 0.5
-        self.ball_radius = 0.06
-        self.n_balls = 100  # Reduced for reasonable render time
+        self.simulation = GaltonSimulation(self.n_balls, self.n_rows)
         
         # Storage for bins
         self.bins_data = []
@@ -65,7 +82,10 @@ class GaltonBoard(Scene):
         self.wait(0.5)
         
         # Drop balls
-        self.drop_all_balls()
+        if self.batched:
+            self.drop_balls_batched()
+        else:
+            self.drop_all_balls()
         
         # Show the pattern
         self.highlight_pattern()
@@ -179,20 +199,20 @@ class GaltonBoard(Scene):
     
     def drop_all_balls(self):
         """Drop all balls with animations."""
-        ball_colors = [
-            BERKELEY_COLORS['rose_garden'],    # Bright magenta
-            BERKELEY_COLORS['california_gold'], # Bright gold
-            BERKELEY_COLORS['golden_gate'],    # Bright red-orange
-            BERKELEY_COLORS['lawrence'],       # Bright cyan
-            BERKELEY_COLORS['lap_lane'],       # Bright teal
-            BERKELEY_COLORS['ion'],            # Bright yellow-green
-        ]
-        
         all_balls = VGroup()
         
+        # Every ball's path, ending stacked in its bin
+        paths = self.simulation.paths(
+            start_y=3.8,
+            row_ys=2.8 - np.arange(self.n_rows) * self.peg_spacing,
+            spacing=self.peg_spacing,
+            floor_y=self.bins_data[0]['bottom_y'],
+            pitch=self.ball_radius * 2.1
+        )
+        
         for i in range(self.n_balls):
             # Pick color
-            color = ball_colors[i % len(ball_colors)]
+            color = BALL_COLORS[i % len(BALL_COLORS)]
             
             # Create ball
             ball = Dot(
@@ -204,24 +224,9 @@ class GaltonBoard(Scene):
                 stroke_color=WHITE
             )
             
-            # Calculate path
-            path_points = self.calculate_path()
-            
-            # Determine landing bin
-            final_x = path_points[-2][0]
-            bin_idx = self.find_bin_index(final_x)
-            
-            # Stack ball in bin
-            final_y = self.bins_data[bin_idx]['bottom_y'] + \
-                     self.bin_counts[bin_idx] * (self.ball_radius * 2.1)
-            path_points[-1] = [self.bins_data[bin_idx]['x'], final_y, 0]
-            
-            # Update count
-            self.bin_counts[bin_idx] += 1
-            
             # Create path
             path = VMobject()
-            path.set_points_as_corners([np.array(p) for p in path_points])
+            path.set_points_as_corners(paths[i])
             
             # Add ball to scene and animate
             self.add(ball)
@@ -238,42 +243,88 @@ class GaltonBoard(Scene):
             if i < self.n_balls - 1 and i % 5 == 0:
                 self.wait(0.05)
         
+        self.bin_counts = self.simulation.counts.tolist()
         self.wait(1)
     
-    def calculate_path(self):
-        """Calculate random path through pegs (Bernoulli trials)."""
-        x = 0
-        y = 3.8
-        path = [[x, y, 0]]
-        
-        start_y = 2.8
-        
-        for row in range(self.n_rows):
-            # Random left (-1) or right (+1)
-            direction = random.choice([-1, 1])
-            x += direction * self.peg_spacing / 2
-            y = start_y - row * self.peg_spacing
+    def drop_balls_batched(self):
+        """
+        Drop all balls as one continuous stream: they leave the top
+        drop_duration / n_balls seconds apart and each takes fall_time to
+        land. The balls in flight are drawn as one shape per color, moved
+        by a single updater; every drop_window seconds the balls that have
+        landed are merged into the pile, which is static while the next
+        window plays. Frame cost depends on how many balls are in flight,
+        not on how many have been dropped.
+        """
+        bin_width = self.peg_spacing * 0.85
+        bin_height = 2.8
+        
+        # Shrink the balls, and fill bins several balls wide, until the
+        # fullest bin fits
+        tallest = int(self.simulation.counts.max())
+        pitch = min(self.ball_radius * 2.1, np.sqrt(bin_width * bin_height / tallest))
+        columns = max(1, int(bin_width // pitch))
+        while np.ceil(tallest / columns) * pitch > bin_height:
+            pitch *= 0.95
+            columns = max(1, int(bin_width // pitch))
+        
+        paths = self.simulation.paths(
+            start_y=3.8,
+            row_ys=2.8 - np.arange(self.n_rows) * self.peg_spacing,
+            spacing=self.peg_spacing,
+            floor_y=self.bins_data[0]['bottom_y'],
+            pitch=pitch,
+            columns=columns
+        )
+        starts = np.arange(self.n_balls) * (self.drop_duration / self.n_balls)
+        landings = starts + self.fall_time
+        colors = np.arange(self.n_balls) % len(BALL_COLORS)
+        
+        # One ball's outline, placed at each position by broadcasting
+        template = Dot(radius=pitch / 2.1).get_points()
+        
+        def ball_shapes():
+            return VGroup(*[
+                VMobject(fill_color=color, fill_opacity=0.8,
+                         stroke_width=0.5, stroke_color=WHITE)
+                for color in BALL_COLORS
+            ])
+        
+        def draw(shapes, positions, ball_colors):
+            for index, shape in enumerate(shapes):
+                centers = positions[ball_colors == index]
+                shape.set_points((template + centers[:, None]).reshape(-1, 3))
+        
+        pile = ball_shapes()
+        flying = ball_shapes()
+        self.add(pile)
+        
+        landed = 0
+        now = 0.0
+        end = landings[-1]
+        while now < end:
+            until = min(now + self.drop_window, end)
+            # Balls that are in the air at some point in this window
+            first, last = landed, int(np.searchsorted(starts, until))
             
-            # Add bounce point
-            path.append([x, y, 0])
-        
-        # Add final drop point (will be adjusted for bin stacking)
-        path.append([x, -2, 0])
+            def update(shapes, alpha, t0=now, t1=until, first=first, last=last):
+                t = t0 + alpha * (t1 - t0)
+                released = starts[first:last] <= t
+                fractions = (t - starts[first:last][released]) / self.fall_time
+                draw(shapes,
+                     positions_along(paths[first:last][released], fractions),
+                     colors[first:last][released])
+            
+            self.play(UpdateFromAlphaFunc(flying, update),
+                      run_time=until - now, rate_func=linear)
+            
+            landed = int(np.searchsorted(landings, until, side='right'))
+            draw(pile, paths[:landed, -1], colors[:landed])
+            now = until
         
-        return path
-    
-    def find_bin_index(self, x_position):
-        """Find which bin the ball lands in."""
-        closest_idx = 0
-        min_dist = float('inf')
-        
-        for i, bin_data in enumerate(self.bins_data):
-            dist = abs(x_position - bin_data['x'])
-            if dist < min_dist:
-                min_dist = dist
-                closest_idx = i
-        
-        return closest_idx
+        self.remove(flying)
+        self.bin_counts = self.simulation.counts.tolist()
+        self.wait(1)
     
     def highlight_pattern(self):
         """Add annotation about the emerging pattern."""
@@ -316,12 +367,17 @@ class GaltonBoard(Scene):
         return curve
 
 
+class GaltonBoardLarge(GaltonBoard):
+    """Galton board with enough balls for a convincing bell shape."""
+    
+    n_balls = 2000
+    batched = True
+
+
 class GaltonBoardQuick(Scene):
     """Quick demo version for testing (fewer balls, faster render)."""
     
     def construct(self):
-        config.frame_rate = 30  # Lower FPS for testing
-        
         # Copyright notice
         copyright = Text(
             "© 2024 Gautam Nayak",
@@ -362,19 +418,20 @@ class GaltonBoardQuick(Scene):
             BERKELEY_COLORS['lawrence'],
         ]
         
+        paths = GaltonSimulation(20, n_rows).paths(
+            start_y=3,
+            row_ys=2 - np.arange(n_rows) * spacing,
+            spacing=spacing,
+            floor_y=-2,
+            pitch=0
+        )
+        
         for i in range(20):
             ball = Dot([0, 3, 0], 
                       radius=0.08,
                       color=bright_colors[i % len(bright_colors)])
             
-            x = 0
-            path_pts = [[0, 3, 0]]
-            for row in range(n_rows):
-                x += random.choice([-1, 1]) * spacing / 2
-                path_pts.append([x, 2 - row * spacing, 0])
-            path_pts.append([x, -2, 0])
-            
-            path = VMobject().set_points_as_corners([np.array(p) for p in path_pts])
+            path = VMobject().set_points_as_corners(paths[i])
             
             self.add(ball)
             self.play(MoveAlongPath(ball, path), run_time=1, rate_func=linear)
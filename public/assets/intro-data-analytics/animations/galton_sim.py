@@ -0,0 +1,92 @@
+"""
+Galton Board Simulation
+=======================
+Vectorized ball paths shared by the Galton board animations
+(galton_board.py and galton_board_final.py).
+
+Every bounce of every ball is drawn at once from a seeded NumPy Generator,
+so a run of thousands of balls takes milliseconds and the same seed always
+gives the same board. Nothing here depends on manim.
+"""
+
+import numpy as np
+
+# Fixed seed so re-renders show the same run
+DEFAULT_SEED = 1889
+
+
+class GaltonSimulation:
+    """
+    The outcome of dropping n_balls through n_rows of pegs, in drop order.
+
+    steps    (n_balls, n_rows) int8: -1 = bounced left, +1 = bounced right
+    offsets  (n_balls, n_rows) int: horizontal position after each row, in
+             half peg spacings from the centre
+    bins     (n_balls,) int: landing bin, 0 (leftmost) to n_rows
+    levels   (n_balls,) int: how many earlier balls landed in the same bin,
+             i.e. the ball's height in the pile
+    counts   (n_rows + 1,) int: balls per bin
+    """
+
+    def __init__(self, n_balls, n_rows, seed=DEFAULT_SEED):
+        self.n_balls = n_balls
+        self.n_rows = n_rows
+        self.n_bins = n_rows + 1
+        rng = np.random.default_rng(seed)
+
+        # Bernoulli trials for every peg of every ball
+        self.steps = rng.integers(0, 2, size=(n_balls, n_rows), dtype=np.int8) * 2 - 1
+        self.offsets = np.cumsum(self.steps, axis=1, dtype=np.int64)
+
+        # Bins sit under the final offsets: bin k is k right bounces
+        final = self.offsets[:, -1] if n_rows else np.zeros(n_balls, dtype=np.int64)
+        self.bins = (final + n_rows) // 2
+        self.counts = np.bincount(self.bins, minlength=self.n_bins)
+
+        # Rank of each ball within its bin: sort by bin keeping drop order,
+        # then subtract where each bin's run starts in the sorted order
+        order = np.argsort(self.bins, kind='stable')
+        starts = np.cumsum(self.counts) - self.counts
+        self.levels = np.empty(n_balls, dtype=np.int64)
+        self.levels[order] = np.arange(n_balls) - np.repeat(starts, self.counts)
+
+    def bin_x(self, spacing):
+        """x coordinate of each bin centre for pegs spacing apart."""
+        return (np.arange(self.n_bins) - self.n_rows / 2) * spacing
+
+    def paths(self, start_y, row_ys, spacing, floor_y, pitch, columns=1):
+        """
+        Corner points of every ball's path as an (n_balls, n_rows + 2, 3)
+        array: the drop point above the board at start_y, one point per
+        row at row_ys, and the ball's resting place in its bin, stacked
+        pitch apart upwards from floor_y. With columns > 1 each bin is
+        filled a layer of that many balls side by side at a time.
+        """
+        column, layer = self.levels % columns, self.levels // columns
+        points = np.zeros((self.n_balls, self.n_rows + 2, 3))
+        points[:, 0, 1] = start_y
+        points[:, 1:-1, 0] = self.offsets * (spacing / 2)
+        points[:, 1:-1, 1] = row_ys
+        points[:, -1, 0] = self.bin_x(spacing)[self.bins] + (column - (columns - 1) / 2) * pitch
+        points[:, -1, 1] = floor_y + layer * pitch
+        return points
+
+
+def positions_along(paths, fractions):
+    """
+    Where each ball is after travelling fractions (n_balls,) of the length
+    of its path (an (n_balls, n_points, 3) array of corners), moving at
+    constant speed like MoveAlongPath with a linear rate function.
+    """
+    segments = np.diff(paths, axis=1)
+    lengths = np.linalg.norm(segments, axis=2)
+    ends = np.cumsum(lengths, axis=1)
+    travelled = np.clip(fractions, 0, 1) * ends[:, -1]
+
+    # Segment each ball is on, and how far along it
+    rows = np.arange(len(paths))
+    index = np.minimum((ends < travelled[:, None]).sum(axis=1), lengths.shape[1] - 1)
+    into = travelled - (ends[rows, index] - lengths[rows, index])
+    share = np.divide(into, lengths[rows, index], out=np.zeros_like(into),
+                      where=lengths[rows, index] > 0)
+    return paths[rows, index] + segments[rows, index] * share[:, None]
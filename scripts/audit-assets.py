@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Audit the site's static assets and move manim render caches out of public/.
+
+This script:
+1. Collects every asset path the site references: /assets/... URLs in the
+   generated HTML and the app source, relative asset paths in the chapter
+   QMD files, and the published videos in content/render-manifest.json
+2. Finds the manim media folders (animations/media/) under public/assets/
+   and content/chapters/ and sorts their files into render caches (text
+   and LaTeX SVGs, images, partial movie files) and finished videos
+3. Reports, per chapter, what is referenced and how many bytes of caches
+   nothing references
+4. With --apply, moves those caches to .cache/manim-media/, where
+   render-animations.py keeps manim's working files. Each file is stored
+   once per content hash (see STORE_DIR) and hard-linked into the media
+   folder of every scene that can use it, so manim still finds it.
+
+Finished videos are never moved, only reported when nothing links to them.
+
+Usage:
+    python audit-assets.py          # report only
+    python audit-assets.py --apply  # move unreferenced caches out of the public tree
+"""
+
+import re
+import os
+import argparse
+import importlib.util
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import unquote
+
+# Project paths
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+ASSETS_DIR = PROJECT_ROOT / "public" / "assets"
+QMD_DIR = PROJECT_ROOT / "content" / "chapters"
+HTML_DIR = PROJECT_ROOT / "content" / "html"
+SRC_DIR = PROJECT_ROOT / "src"
+
+# Where manim media folders can appear
+MEDIA_GLOBS = (
+    (ASSETS_DIR, "*/animations/media"),
+    (QMD_DIR, "*/animations/media"),
+)
+
+# Path components that mark manim render caches inside a media folder
+CACHE_PARTS = frozenset({'texts', 'Tex', 'images', 'partial_movie_files'})
+
+# Chapter asset folders build-qmd.sh copies (and QMD files link to)
+ASSET_FOLDERS = ('images', 'figures', 'animations', 'assets', 'interactives')
+
+SOURCE_SUFFIXES = frozenset({'.ts', '.tsx', '.js', '.jsx', '.mjs', '.css', '.md', '.json'})
+
+ASSET_URL = re.compile(r"/assets/([^\s\"'()<>?#]+)")
+RELATIVE_ASSET = re.compile(
+    r"(?<![\w/.-])((?:%s)/[^\s\"'()<>?#\]]+)" % '|'.join(ASSET_FOLDERS))
+
+
+def _load_renderer():
+    """render-animations.py, for its scene discovery and media paths."""
+    spec = importlib.util.spec_from_file_location(
+        'render_animations', SCRIPT_DIR / "render-animations.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+renderer = _load_renderer()
+MEDIA_DIR = renderer.MEDIA_DIR
+STORE_DIR = MEDIA_DIR / "store"
+project_relative = renderer.project_relative
+sha256_file = renderer.sha256_file
+
+
+def collect_references():
+    """Project-relative paths of every asset file the site links to."""
+    references = set()
+
+    def add_url(match):
+        references.add(f"public/assets/{unquote(match)}")
+
+    for html_file in HTML_DIR.glob("*.html"):
+        for match in ASSET_URL.findall(html_file.read_text(encoding='utf-8', errors='replace')):
+            add_url(match)
+
+    if SRC_DIR.is_dir():
+        for source in SRC_DIR.rglob("*"):
+            if source.suffix in SOURCE_SUFFIXES and source.is_file():
+                for match in ASSET_URL.findall(source.read_text(encoding='utf-8', errors='replace')):
+                    add_url(match)
+
+    # Chapter-relative links; build-qmd.sh copies them to public/assets/<slug>/
+    for qmd_file in QMD_DIR.glob("*/*.qmd"):
+        slug = qmd_file.parent.name
+        for match in RELATIVE_ASSET.findall(qmd_file.read_text(encoding='utf-8', errors='replace')):
+            match = unquote(match)
+            references.add(f"content/chapters/{slug}/{match}")
+            references.add(f"public/assets/{slug}/{match}")
+
+    references.update(renderer.RenderManifest(renderer.PUBLISH_MANIFEST_PATH).videos)
+    return references
+
+
+def find_media_files():
+    """
+    Return (path, media_root, kind) for every file in a manim media folder,
+    kind being 'cache' or 'video'.
+    """
+    files = []
+    for base, pattern in MEDIA_GLOBS:
+        for media_root in sorted(base.glob(pattern)):
+            for path in sorted(media_root.rglob("*")):
+                if not path.is_file():
+                    continue
+                parts = set(path.relative_to(media_root).parts)
+                files.append((path, media_root, 'cache' if parts & CACHE_PARTS else 'video'))
+    return files
+
+
+def scene_media_dirs(media_root):
+    """
+    The render-animations.py media folders of the scenes whose scripts sit
+    next to media_root, plus any that already exist for its chapter.
+    """
+    animations_dir = media_root.parent
+    chapter = animations_dir.parent.name
+    scenes = {scene for path in animations_dir.glob("*.py")
+              for scene in renderer.find_scene_classes(path)}
+    chapter_dir = MEDIA_DIR / chapter
+    if chapter_dir.is_dir():
+        scenes.update(path.name for path in chapter_dir.iterdir() if path.is_dir())
+    return [chapter_dir / scene for scene in sorted(scenes)]
+
+
+def cache_destinations(path, media_root):
+    """
+    Where a cache file belongs under MEDIA_DIR: partial movie files in
+    their scene's folder, shared caches (texts, Tex, images) in every
+    scene folder of the chapter.
+    """
+    relative = path.relative_to(media_root)
+    parts = relative.parts
+    if 'partial_movie_files' in parts:
+        scene = parts[parts.index('partial_movie_files') + 1]
+        return [MEDIA_DIR / media_root.parent.parent.name / scene / relative]
+    return [scene_dir / relative for scene_dir in scene_media_dirs(media_root)]
+
+
+def move_to_store(path, destinations):
+    """
+    Move path into STORE_DIR (once per content hash) and hard-link it to
+    each destination. Returns the bytes newly written to the store.
+    """
+    digest = sha256_file(path)
+    stored = STORE_DIR / digest[:2] / digest
+    added = 0
+    if stored.exists():
+        path.unlink()
+    else:
+        stored.parent.mkdir(parents=True, exist_ok=True)
+        added = path.stat().st_size
+        os.replace(path, stored)
+    for destination in destinations:
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        if destination.exists():
+            destination.unlink()
+        try:
+            os.link(stored, destination)
+        except OSError:
+            # Different file system, or no hard links
+            destination.write_bytes(stored.read_bytes())
+    return added
+
+
+def remove_empty_dirs(root):
+    for directory in sorted((p for p in root.rglob("*") if p.is_dir()),
+                            key=lambda p: len(p.parts), reverse=True):
+        try:
+            directory.rmdir()
+        except OSError:
+            pass
+    try:
+        root.rmdir()
+    except OSError:
+        pass
+
+
+def megabytes(size):
+    return f"{size / 2**20:.1f} MB"
+
+
+def audit(apply=False):
+    """Print the report and, with apply, move unreferenced caches. Returns bytes moved."""
+    references = collect_references()
+    media_files = find_media_files()
+
+    by_chapter = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    unreferenced_videos = []
+    to_move = []
+    for path, media_root, kind in media_files:
+        chapter = project_relative(media_root.parent.parent)
+        size = path.stat().st_size
+        referenced = project_relative(path) in references
+        key = f"{kind} referenced" if referenced else f"{kind} unreferenced"
+        by_chapter[chapter][key][0] += 1
+        by_chapter[chapter][key][1] += size
+        if kind == 'video' and not referenced:
+            unreferenced_videos.append((path, size))
+        elif kind == 'cache' and not referenced:
+            to_move.append((path, media_root, size))
+
+    if not media_files:
+        print("No manim media folders found.")
+        return 0
+
+    for chapter in sorted(by_chapter):
+        print(f"{chapter}/animations/media:")
+        for key in sorted(by_chapter[chapter]):
+            count, size = by_chapter[chapter][key]
+            print(f"  {key:<22} {count:5d} files  {megabytes(size):>9}")
+    if unreferenced_videos:
+        print("\nVideos nothing links to (left in place):")
+        for path, size in unreferenced_videos:
+            print(f"  {project_relative(path)} ({megabytes(size)})")
+
+    total = sum(size for _, _, size in to_move)
+    if not to_move:
+        print("\nNo unreferenced render caches.")
+        return 0
+    if not apply:
+        print(f"\n{len(to_move)} unreferenced cache files ({megabytes(total)}) "
+              f"can be moved to {project_relative(MEDIA_DIR)}/ (run with --apply)")
+        return 0
+
+    stored = 0
+    for path, media_root, _ in to_move:
+        stored += move_to_store(path, cache_destinations(path, media_root))
+    for media_root in {media_root for _, media_root, _ in to_move}:
+        remove_empty_dirs(media_root)
+    print(f"\nMoved {len(to_move)} cache files out of the public tree: saved {megabytes(total)} "
+          f"({megabytes(stored)} added to {project_relative(STORE_DIR)}/ after deduplication)")
+    return total
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Report which manim media files the site uses and move render caches "
+                    "out of public/.")
+    parser.add_argument('--apply', action='store_true',
+                        help=f"move unreferenced render caches to {project_relative(MEDIA_DIR)}/")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    audit(apply=args.apply)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,24 @@
 #!/bin/bash
 # Build script: Convert QMD files to clean HTML using Pandoc (bypassing Quarto)
+#
+# Chapters whose source hashes the same as when their HTML was last built
+# (see HTML_STAMP_DIR) aren't converted again, but their assets are always
+# copied; pass --force to convert them all.
 
 SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 PROJECT_ROOT="$(dirname "$SCRIPT_DIR")"
 QMD_DIR="$PROJECT_ROOT/content/chapters"
 HTML_DIR="$PROJECT_ROOT/content/html"
 ASSETS_DIR="$PROJECT_ROOT/public/assets"
+# One file per chapter holding the hash its HTML was built from
+HTML_STAMP_DIR="$PROJECT_ROOT/.cache/qmd-html"
+
+FORCE=0
+PREPROCESS_ARGS=(--jobs 0)
+if [ "$1" == "--force" ]; then
+    FORCE=1
+    PREPROCESS_ARGS+=(--force)
+fi
 
 # Cross-platform sed in-place: macOS requires '', Linux doesn't
 sedi() {
@@ -16,21 +29,32 @@ sedi() {
     fi
 }
 
+# Hash of stdin (sha256sum on Linux, shasum on macOS)
+sha256() {
+    if command -v sha256sum &> /dev/null; then
+        sha256sum | cut -d' ' -f1
+    else
+        shasum -a 256 | cut -d' ' -f1
+    fi
+}
+
 # Ensure output directories exist
 mkdir -p "$HTML_DIR"
 mkdir -p "$ASSETS_DIR"
+mkdir -p "$HTML_STAMP_DIR"
 
 # Check for Pandoc
 if ! command -v pandoc &> /dev/null; then
     echo "Error: Pandoc is not installed. Please install it first."
     exit 1
 fi
+PANDOC_VERSION="$(pandoc --version | head -n 1)"
 
 # Step 1: Preprocess QMD files with Python code blocks
 # This executes Python code and inserts output into the QMD files
 echo "Step 1: Preprocessing Python code blocks..."
 if command -v python3 &> /dev/null; then
-    python3 "$SCRIPT_DIR/preprocess-python-qmd.py" 2>&1
+    python3 "$SCRIPT_DIR/preprocess-python-qmd.py" "${PREPROCESS_ARGS[@]}" 2>&1
     if [ $? -ne 0 ]; then
         echo "Warning: Python preprocessing had errors (continuing anyway)"
     fi
@@ -50,38 +74,52 @@ find "$QMD_DIR" -name "index.qmd" -type f | while read -r qmd_file; do
     chapter_dir=$(dirname "$qmd_file")
     slug=$(basename "$chapter_dir")
 
-    echo "  Converting: $slug"
-
-    # Convert QMD to HTML using Pandoc
-    pandoc "$qmd_file" \
-        -f markdown \
-        -t html \
-        --katex \
-        -o "$HTML_DIR/$slug.html" 2>/dev/null
+    # The preprocessor only rewrites files whose output changed, so HTML
+    # built from a source with the same hash (and the same pandoc) is current
+    html_file="$HTML_DIR/$slug.html"
+    stamp_file="$HTML_STAMP_DIR/$slug.sha256"
+    source_hash=$({ echo "$PANDOC_VERSION"; cat "$qmd_file"; } | sha256)
+    if [ $FORCE -eq 0 ] && [ -f "$html_file" ] && \
+       [ "$(cat "$stamp_file" 2>/dev/null)" == "$source_hash" ]; then
+        echo "  Up to date: $slug"
+    else
+        echo "  Converting: $slug"
 
-    if [ $? -eq 0 ]; then
+        # Convert QMD to HTML using Pandoc
+        if ! pandoc "$qmd_file" \
+            -f markdown \
+            -t html \
+            --katex \
+            -o "$html_file" 2>/dev/null; then
+            echo "    ✗ Failed: $slug"
+            rm -f "$stamp_file"
+            continue
+        fi
         echo "    ✓ Created: $slug.html"
 
-        # Copy assets (images, figures, animations, interactives) if they exist
-        for asset_folder in images figures animations assets interactives; do
-            if [ -d "$chapter_dir/$asset_folder" ]; then
-                mkdir -p "$ASSETS_DIR/$slug/$asset_folder"
-                cp -r "$chapter_dir/$asset_folder/"* "$ASSETS_DIR/$slug/$asset_folder/" 2>/dev/null
-                echo "    ✓ Copied: $asset_folder/"
-            fi
-        done
-
         # Rewrite image paths in HTML to point to /assets/[slug]/
         # images/foo.png -> /assets/slug/images/foo.png
-        sedi "s|src=\"images/|src=\"/assets/$slug/images/|g" "$HTML_DIR/$slug.html"
-        sedi "s|src=\"figures/|src=\"/assets/$slug/figures/|g" "$HTML_DIR/$slug.html"
-        sedi "s|src=\"animations/|src=\"/assets/$slug/animations/|g" "$HTML_DIR/$slug.html"
-        sedi "s|src=\"assets/|src=\"/assets/$slug/assets/|g" "$HTML_DIR/$slug.html"
-        sedi "s|src=\"interactives/|src=\"/assets/$slug/interactives/|g" "$HTML_DIR/$slug.html"
-
-    else
-        echo "    ✗ Failed: $slug"
+        sedi "s|src=\"images/|src=\"/assets/$slug/images/|g" "$html_file"
+        sedi "s|src=\"figures/|src=\"/assets/$slug/figures/|g" "$html_file"
+        sedi "s|src=\"animations/|src=\"/assets/$slug/animations/|g" "$html_file"
+        sedi "s|src=\"assets/|src=\"/assets/$slug/assets/|g" "$html_file"
+        sedi "s|src=\"interactives/|src=\"/assets/$slug/interactives/|g" "$html_file"
+        echo "$source_hash" > "$stamp_file"
     fi
+
+    # Copy assets (images, figures, animations, interactives) if they exist,
+    # whether or not the chapter was converted, so public/ always has them
+    for asset_folder in images figures animations assets interactives; do
+        if [ -d "$chapter_dir/$asset_folder" ]; then
+            mkdir -p "$ASSETS_DIR/$slug/$asset_folder"
+            for entry in "$chapter_dir/$asset_folder/"*; do
+                # manim's media/ folder is render caches; videos are published by render-animations.py
+                [ "$(basename "$entry")" = "media" ] && continue
+                cp -r "$entry" "$ASSETS_DIR/$slug/$asset_folder/" 2>/dev/null
+            done
+            echo "    ✓ Copied: $asset_folder/"
+        fi
+    done
 done
 
 echo ""
@@ -6,7 +6,15 @@ This script:
 1. Parses QMD files looking for ```python code blocks
 2. Executes them in sequence (maintaining state between blocks in same file)
 3. Captures stdout and inserts it as output blocks
-4. Detects plt.savefig() calls and adds image references
+4. Records every figure a block saves or leaves open (see FigureCapture)
+   and adds image references
+
+Results are cached on disk (see EXEC_CACHE_DIR) keyed by the block sequence,
+interpreter/library versions and any data files the code references, so an
+unchanged chapter replays its stored output and figures without executing.
+A build manifest (see BUILD_MANIFEST_PATH) records what each chapter was
+built from and what it produced; chapters whose inputs and outputs still
+match are skipped without being read twice or rewritten.
 
 Output blocks are marked with special comments so they can be regenerated:
     <!-- AUTO-OUTPUT-START -->
@@ -18,16 +26,74 @@ Output blocks are marked with special comments so they can be regenerated:
 Usage:
     python preprocess-python-qmd.py [path/to/file.qmd]
     python preprocess-python-qmd.py  # processes all QMD files with python blocks
+    python preprocess-python-qmd.py --no-cache  # ignore and don't update the cache
+    python preprocess-python-qmd.py --no-checkpoints  # don't save namespaces between blocks
+    python preprocess-python-qmd.py --jobs 4    # run up to 4 chapters in parallel
+    python preprocess-python-qmd.py --branches 4  # run independent blocks of a file in forks
+    python preprocess-python-qmd.py --since origin/main  # only chapters changed since a git rev
+    python preprocess-python-qmd.py --force     # ignore the build manifest
+    python preprocess-python-qmd.py --serve     # start the warm kernel (authoring)
+    python preprocess-python-qmd.py --watch     # re-run chapters on save (uses the kernel)
+    python preprocess-python-qmd.py --top 10 --trace-memory  # profile blocks
+    python preprocess-python-qmd.py --block-timeout 60 --memory-limit 2048
+    python preprocess-python-qmd.py --changed-list changed.txt  # list rewritten files
+
+Each file's blocks are analysed for the names they read and write (see
+plan_blocks). After an edit only the changed blocks, the blocks
+downstream of them and what those need are executed; everything else is
+replayed from the cache. With --branches, blocks whose results no later
+block reads also run in a fork of the namespace while the rest of the
+file carries on (opt-in: the analysis can't see every change a block
+makes to library state). The namespace is
+also checkpointed to disk between blocks (see NamespaceCheckpoints), so
+that work starts from the last checkpoint still valid rather than from
+the top of the file.
+
+Blocks run in a supervised child process so a runaway block can be stopped
+(see DEFAULT_LIMITS); it gets an [Execution Error] output and the build
+moves on to the next file.
+
+Every run writes per-block timings to a JSON report (see BUILD_REPORT_PATH)
+and prints the slowest blocks at the end.
 """
 
-import re
 import sys
 import os
+import ast
+import json
+import hashlib
+import argparse
+import pickle
+import subprocess
+import signal
+import shutil
+import socket
+import threading
+import tempfile
+import time
+import types
+import datetime
+import functools
+import importlib.util
+import tracemalloc
+import importlib.metadata
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from io import StringIO
-from contextlib import redirect_stdout
+from io import StringIO, BytesIO
+from contextlib import redirect_stdout, redirect_stderr
 import traceback
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import cloudpickle  # pickles functions and classes defined in a chapter
+except ImportError:
+    cloudpickle = None
+
 # Set matplotlib to non-interactive backend BEFORE any other imports
 # This prevents plt.show() from blocking execution
 import matplotlib
@@ -38,54 +104,987 @@ SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 QMD_DIR = PROJECT_ROOT / "content" / "chapters"
 
+# Chapter code can import the shared dact package from the project root
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+# Project packages every block's namespace starts with (see new_namespace)
+NAMESPACE_PACKAGES = ('dact',)
+
 # Markers for auto-generated output
 OUTPUT_START = "<!-- AUTO-OUTPUT-START -->"
 OUTPUT_END = "<!-- AUTO-OUTPUT-END -->"
 
+# Execution cache: one JSON entry per block, figures stored by content hash
+EXEC_CACHE_DIR = Path(os.environ.get('QMD_CACHE_DIR', PROJECT_ROOT / ".cache" / "qmd-exec"))
+EXEC_CACHE_VERSION = 2
+
+# Namespace checkpoints: the namespace saved after a block, so a later run
+# can start there instead of re-running everything before it. One is
+# written once at least CHECKPOINT_INTERVAL seconds of blocks have run
+# since the last; unused ones are removed after CHECKPOINT_MAX_AGE days.
+CHECKPOINT_DIR = Path(os.environ.get('QMD_CHECKPOINT_DIR',
+                                     PROJECT_ROOT / ".cache" / "qmd-checkpoints"))
+CHECKPOINT_VERSION = 1
+CHECKPOINT_INTERVAL = 1.0
+CHECKPOINT_MAX_AGE = 14
+
+# Per-chapter record of the last build, used to skip unchanged chapters
+BUILD_MANIFEST_PATH = Path(os.environ.get(
+    'QMD_BUILD_MANIFEST', PROJECT_ROOT / ".cache" / "qmd-build-manifest.json"))
+BUILD_MANIFEST_VERSION = 1
+
+# Figures a block leaves open without saving are written as
+# figures/<AUTO_FIGURE_PREFIX><code hash>-<n>.png
+AUTO_FIGURE_PREFIX = "auto-"
+FIGURE_WORKERS = 2
+
+# Default execution limits (seconds / megabytes, None = unlimited)
+DEFAULT_LIMITS = {
+    'block_timeout': 300,
+    'file_timeout': 900,
+    'memory_limit': None,
+}
+
+# Machine-readable per-block timings of the last run
+BUILD_REPORT_PATH = PROJECT_ROOT / ".cache" / "qmd-build-report.json"
+
+# Libraries whose version changes invalidate cached output
+CACHE_TRACKED_PACKAGES = (
+    'numpy', 'pandas', 'matplotlib', 'seaborn', 'scikit-learn', 'scipy', 'statsmodels',
+)
+
+PYTHON_FENCE_OPEN = "```python\n"
+FENCE_CLOSE = "```"
+
+
+def parse_qmd(content):
+    """
+    Split QMD content into segments in a single pass: plain text strings
+    and a {'code', 'source', 'line'} dict for each ```python block
+    (not ```{python}, which is Quarto-style). Existing auto-generated
+    output, and the blank line insert_outputs() puts before it, is dropped
+    so repeated runs are stable. 'line' is the block's 1-based line number
+    in the stripped source.
+    """
+    segments = []
+    pos = 0
+    line = 1
+    # Next occurrence of each token; only searched again once passed, so a
+    # token that doesn't occur costs one scan rather than one per block
+    fence = marker = -1
+
+    def emit(text):
+        nonlocal line
+        if text:
+            segments.append(text)
+            line += text.count('\n')
+
+    while True:
+        if fence is not None and fence < pos:
+            fence = content.find(PYTHON_FENCE_OPEN, pos)
+            fence = None if fence == -1 else fence
+        if marker is not None and marker < pos:
+            marker = content.find(OUTPUT_START, pos)
+            marker = None if marker == -1 else marker
+
+        if marker is not None and (fence is None or marker < fence):
+            end = content.find(OUTPUT_END, marker + len(OUTPUT_START))
+            if end == -1:
+                # Unterminated marker: keep it as plain text
+                emit(content[pos:marker + len(OUTPUT_START)])
+                pos = marker + len(OUTPUT_START)
+                continue
+            text = content[pos:marker]
+            emit(text[:-2] if text.endswith('\n\n') else text)
+            pos = end + len(OUTPUT_END)
+            continue
+
+        if fence is None:
+            break
+        code_start = fence + len(PYTHON_FENCE_OPEN)
+        close = content.find(FENCE_CLOSE, code_start)
+        if close == -1:
+            break
+        emit(content[pos:fence])
+        source = content[fence:close + len(FENCE_CLOSE)]
+        segments.append({'code': content[code_start:close], 'source': source, 'line': line})
+        line += source.count('\n')
+        pos = close + len(FENCE_CLOSE)
+
+    emit(content[pos:])
+    return segments
+
+
+def segments_source(segments):
+    """The QMD source the segments came from, without generated output."""
+    return ''.join(seg if isinstance(seg, str) else seg['source'] for seg in segments)
+
+
+def segment_blocks(segments):
+    """The Python code blocks among the segments, in order."""
+    return [seg for seg in segments if not isinstance(seg, str)]
+
+
 def find_python_code_blocks(content):
     """
-    Find all Python code blocks in QMD content.
-    Returns list of (start_pos, end_pos, code) tuples.
-    """
-    # Match ```python ... ``` blocks (not ```{python} which is Quarto-style)
-    pattern = r'```python\n(.*?)```'
-    blocks = []
-    for match in re.finditer(pattern, content, re.DOTALL):
-        blocks.append({
-            'start': match.start(),
-            'end': match.end(),
-            'code': match.group(1),
-            'full_match': match.group(0)
-        })
-    return blocks
+    Find all Python code blocks in QMD content, ignoring generated output.
+    Returns a list of {'code', 'source', 'line'} dicts.
+    """
+    return segment_blocks(parse_qmd(content))
 
 
 def remove_existing_output(content):
+    """Remove any existing auto-generated output blocks."""
+    return segments_source(parse_qmd(content))
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_if_changed(path, data):
     """
-    Remove any existing auto-generated output blocks.
+    Atomically replace path with data (bytes) unless it already holds
+    exactly these bytes, so unchanged files keep their mtime.
+    Returns True if the file was written.
     """
-    pattern = f'{re.escape(OUTPUT_START)}.*?{re.escape(OUTPUT_END)}'
-    return re.sub(pattern, '', content, flags=re.DOTALL)
+    path = Path(path)
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    try:
+        shutil.copymode(path, tmp)
+    except OSError:
+        pass
+    os.replace(tmp, path)
+    return True
 
 
-def extract_savefig_path(code):
+def project_relative(path):
+    """Path relative to the project root (absolute if outside it), as a string."""
+    resolved = Path(path).resolve()
+    try:
+        return resolved.relative_to(PROJECT_ROOT.resolve()).as_posix()
+    except ValueError:
+        return str(resolved)
+
+
+def environment_fingerprint():
     """
-    Extract the path from plt.savefig() call if present.
-    Returns the path string or None.
+    Describe the interpreter and tracked library versions.
+    Any change here invalidates every cached block.
+    """
+    versions = {}
+    for package in CACHE_TRACKED_PACKAGES:
+        try:
+            versions[package] = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            versions[package] = None
+    return json.dumps({
+        'cache_version': EXEC_CACHE_VERSION,
+        'python': sys.version,
+        'packages': versions,
+    }, sort_keys=True)
+
+
+def referenced_data_files(code, working_dir):
     """
-    # Match plt.savefig('path') or plt.savefig("path")
-    match = re.search(r"plt\.savefig\(['\"]([^'\"]+)['\"]", code)
-    if match:
-        return match.group(1)
+    Find files read by a block: string literals that name an existing file
+    relative to the chapter directory. Generated figures are outputs, not
+    inputs, so anything under figures/ is ignored.
+    Returns a sorted list of relative path strings.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+
+    paths = set()
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Constant) and isinstance(node.value, str)):
+            continue
+        value = node.value
+        if not value or '\n' in value or len(value) > 255:
+            continue
+        candidate = Path(working_dir) / value
+        try:
+            if not candidate.is_file():
+                continue
+        except OSError:
+            continue
+        if Path(value).parts[:1] == ('figures',):
+            continue
+        paths.add(value)
+    return sorted(paths)
+
+
+def _module_files(name, search_dirs):
+    """The project files importing module name loads, if it is local."""
+    parts = name.split('.')
+    for base in search_dirs:
+        package_inits = []
+        for depth in range(1, len(parts)):
+            init = base.joinpath(*parts[:depth], "__init__.py")
+            if init.is_file():
+                package_inits.append(init)
+        for candidate in (base.joinpath(*parts).with_suffix('.py'),
+                          base.joinpath(*parts, "__init__.py")):
+            if candidate.is_file():
+                return package_inits + [candidate]
+    return []
+
+
+def _dotted_name(node):
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        return '.'.join([node.id, *reversed(parts)])
     return None
 
 
-def execute_code_blocks(blocks, working_dir):
+def _imported_names(tree, path=None):
     """
-    Execute code blocks in sequence, capturing output.
-    Returns list of outputs (one per block).
+    (module name, directories to look in) for each import in tree. In a
+    block (path None), uses of the NAMESPACE_PACKAGES it didn't import
+    (dact.balance.balance_table) count as imports too.
+    """
+    root = PROJECT_ROOT.resolve()
+    for node in ast.walk(tree):
+        if path is None and isinstance(node, (ast.Name, ast.Attribute)):
+            name = _dotted_name(node)
+            if name and name.split('.')[0] in NAMESPACE_PACKAGES:
+                yield name, [root]
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name, [root]
+        elif isinstance(node, ast.ImportFrom):
+            if node.level and path is None:
+                continue
+            dirs = [path.parent.joinpath(*[".."] * (node.level - 1)).resolve()] if node.level else [root]
+            prefix = f"{node.module}." if node.module else ""
+            for name in ([node.module] if node.module else []) + [prefix + a.name for a in node.names]:
+                yield name, dirs
+
+
+def referenced_modules(code):
+    """
+    Find the project modules a block imports (the dact package, say),
+    directly or through other project modules. Installed libraries are
+    left out; environment_fingerprint() covers them.
+    Returns a sorted list of paths relative to the project root.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+
+    pending = [file for name, dirs in _imported_names(tree) for file in _module_files(name, dirs)]
+    seen = set()
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        try:
+            module_tree = ast.parse(current.read_text(encoding='utf-8'), filename=str(current))
+        except (OSError, SyntaxError):
+            continue
+        pending += [file for name, dirs in _imported_names(module_tree, current)
+                    for file in _module_files(name, dirs)]
+    return sorted(project_relative(path) for path in seen)
+
+
+# Calls that can read or rebind any global: a block using them depends on
+# every earlier block and every later block depends on it
+BARRIER_CALLS = frozenset({'exec', 'eval', 'globals', 'locals', 'vars', '__import__'})
+
+# Method calls that change their receiver in place
+MUTATING_METHODS = frozenset({
+    'append', 'extend', 'insert', 'pop', 'popitem', 'remove', 'clear', 'update',
+    'setdefault', 'sort', 'reverse', 'add', 'discard',
+    'fit', 'partial_fit', 'fit_transform', 'set_params',
+})
+
+# Calls that write or read files other blocks may use
+FILE_WRITE_CALLS = frozenset({
+    'open', 'dump', 'save', 'savez', 'savez_compressed', 'savetxt', 'write_text', 'write_bytes',
+    'to_csv', 'to_excel', 'to_feather', 'to_hdf', 'to_json', 'to_parquet', 'to_pickle',
+    'to_sql', 'to_stata',
+})
+FILE_READ_CALLS = frozenset({
+    'open', 'load', 'loadtxt', 'genfromtxt', 'fromfile', 'read_text', 'read_bytes',
+})
+
+# Pseudo-names for state that isn't held in a variable
+RANDOM_STATE = '<random>'
+FILE_STATE = '<files>'
+LIBRARY_STATE = '<library>'  # settings kept by imported modules (print options, rcParams)
+
+
+def _base_name(node):
+    """The variable at the root of df.loc[...].x, or None."""
+    while isinstance(node, (ast.Attribute, ast.Subscript, ast.Call)):
+        node = node.func if isinstance(node, ast.Call) else node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+class _NameAnalyzer(ast.NodeVisitor):
+    """
+    Collect the global names a block reads and writes. Conservative: when
+    in doubt a name counts as read, and in-place changes (item and
+    attribute assignment, augmented assignment, MUTATING_METHODS, calls
+    with inplace=True) count as writes of the variable being changed.
+    binds holds the names bound outright (assignment, import, def).
+
+    modules holds the names bound to imported modules (and names imported
+    from them). Calling into one reads LIBRARY_STATE; changing one, or
+    calling into one without keeping the result (np.set_printoptions(...),
+    plt.rcParams.update(...)), writes it.
+
+    Reads of a name the block has already bound unconditionally (at the
+    top level, or as the target of the enclosing for/with) are not reads
+    of another block's value, so they aren't counted.
+    """
+
+    def __init__(self, modules=()):
+        self.reads = set()
+        self.writes = set()
+        self.binds = set()
+        self.functions = {}
+        self.modules = set(modules)
+        self.barrier = False
+        self.bound = set()
+        self.depth = 0
+
+    def _read(self, name):
+        if name is not None and name not in self.bound:
+            self.reads.add(name)
+
+    def _bind(self, name):
+        self.binds.add(name)
+        self.writes.add(name)
+        if self.depth == 0:
+            self.bound.add(name)
+
+    def _mutate(self, name):
+        if name is not None:
+            self._read(name)
+            self.writes.add(name)
+            if name in self.modules:
+                self.writes.add(LIBRARY_STATE)
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self._read(node.id)
+        else:
+            self._bind(node.id)
+        if node.id == 'random':
+            self._mutate(RANDOM_STATE)
+
+    def visit_Attribute(self, node):
+        if node.attr in ('random', 'seed'):
+            self._mutate(RANDOM_STATE)
+        if not isinstance(node.ctx, ast.Load):
+            self._mutate(_base_name(node))
+        self.generic_visit(node)
+
+    def visit_Subscript(self, node):
+        if not isinstance(node.ctx, ast.Load):
+            self._mutate(_base_name(node))
+        self.generic_visit(node)
+
+    def visit_AugAssign(self, node):
+        self._mutate(_base_name(node.target))
+        self.visit(node.value)
+        self.visit(node.target)
+
+    # Right-hand sides are evaluated before their targets are bound
+    def visit_Assign(self, node):
+        self.visit(node.value)
+        for target in node.targets:
+            self.visit(target)
+
+    def visit_AnnAssign(self, node):
+        if node.value is not None:
+            self.visit(node.value)
+        self.visit(node.target)
+
+    def visit_NamedExpr(self, node):
+        self.visit(node.value)
+        self.visit(node.target)
+
+    def _visit_compound(self, node):
+        # Bindings inside a branch or loop may not happen
+        self.depth += 1
+        self.generic_visit(node)
+        self.depth -= 1
+
+    visit_If = _visit_compound
+    visit_While = _visit_compound
+    visit_Try = _visit_compound
+    visit_Match = _visit_compound
+    if hasattr(ast, 'TryStar'):
+        visit_TryStar = _visit_compound
+
+    def _visit_with_targets(self, targets, body):
+        """Visit body with targets (for/with variables) bound."""
+        self.depth += 1
+        for target in targets:
+            self.visit(target)
+        saved = set(self.bound)
+        self.bound |= {name.id for target in targets for name in ast.walk(target)
+                       if isinstance(name, ast.Name)}
+        for child in body:
+            self.visit(child)
+        self.bound = saved
+        self.depth -= 1
+
+    def visit_For(self, node):
+        self.visit(node.iter)
+        self._visit_with_targets([node.target], node.body)
+        self.depth += 1
+        for child in node.orelse:
+            self.visit(child)
+        self.depth -= 1
+
+    visit_AsyncFor = visit_For
+
+    def visit_With(self, node):
+        for item in node.items:
+            self.visit(item.context_expr)
+        self._visit_with_targets([item.optional_vars for item in node.items
+                                  if item.optional_vars is not None], node.body)
+
+    visit_AsyncWith = visit_With
+
+    def visit_Expr(self, node):
+        # A library call made for its effect rather than its result
+        if isinstance(node.value, ast.Call) and _base_name(node.value.func) in self.modules:
+            self.writes.add(LIBRARY_STATE)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        func = node.func
+        name = func.id if isinstance(func, ast.Name) else getattr(func, 'attr', None)
+        if _base_name(func) in self.modules:
+            self.reads.add(LIBRARY_STATE)
+        if isinstance(func, ast.Name) and func.id in BARRIER_CALLS:
+            self.barrier = True
+        if isinstance(func, ast.Attribute):
+            inplace = any(kw.arg == 'inplace' and not (isinstance(kw.value, ast.Constant)
+                                                       and kw.value.value is False)
+                          for kw in node.keywords)
+            if func.attr in MUTATING_METHODS or inplace:
+                self._mutate(_base_name(func.value))
+        if name in FILE_WRITE_CALLS:
+            self.writes.add(FILE_STATE)
+        if name in FILE_READ_CALLS or (name or '').startswith('read_'):
+            self.reads.add(FILE_STATE)
+        self.generic_visit(node)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self._bind(alias.asname or alias.name.split('.')[0])
+            self.modules.add(alias.asname or alias.name.split('.')[0])
+
+    def visit_ImportFrom(self, node):
+        for alias in node.names:
+            if alias.name == '*':
+                self.barrier = True
+            else:
+                self._bind(alias.asname or alias.name)
+                self.modules.add(alias.asname or alias.name)
+
+    def visit_Global(self, node):
+        self.barrier = True
+
+    visit_Nonlocal = visit_Global
+
+    def _visit_scope(self, node, body, bound):
+        """A function or class body: record what running it reads and writes."""
+        inner = _NameAnalyzer(self.modules)
+        for child in body:
+            inner.visit(child)
+        reads, writes = set(inner.reads), set(inner.writes)
+        for inner_reads, inner_writes in inner.functions.values():
+            reads |= inner_reads
+            writes |= inner_writes
+        local = inner.binds | bound
+        self.functions[node.name] = (reads - local, writes - local)
+        self.barrier |= inner.barrier
+        self._bind(node.name)
+
+    def visit_FunctionDef(self, node):
+        for child in node.decorator_list + node.args.defaults + node.args.kw_defaults:
+            if child is not None:
+                self.visit(child)
+        args = node.args
+        bound = {arg.arg for arg in args.posonlyargs + args.args + args.kwonlyargs}
+        bound |= {arg.arg for arg in (args.vararg, args.kwarg) if arg is not None}
+        self._visit_scope(node, node.body, bound)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        for child in node.decorator_list + node.bases + [kw.value for kw in node.keywords]:
+            self.visit(child)
+        self._visit_scope(node, node.body, set())
+
+    def _visit_comprehension(self, node):
+        inner = _NameAnalyzer(self.modules)
+        inner.generic_visit(node)
+        targets = {name.id for generator in node.generators
+                   for name in ast.walk(generator.target) if isinstance(name, ast.Name)}
+        self.reads |= inner.reads - targets - self.bound
+        self.writes |= inner.writes - targets
+        self.binds |= inner.binds - targets
+        self.functions.update(inner.functions)
+        self.barrier |= inner.barrier
+
+    visit_ListComp = _visit_comprehension
+    visit_SetComp = _visit_comprehension
+    visit_DictComp = _visit_comprehension
+    visit_GeneratorExp = _visit_comprehension
+
+
+def analyze_block(code, modules=()):
+    """
+    Return {'reads', 'writes', 'functions', 'modules', 'barrier'} for a
+    block's code, given the names earlier blocks bound to modules.
+    functions maps each function or class it defines to the (reads, writes)
+    a call to it makes; modules adds the block's own imports. Code that
+    doesn't parse is a barrier.
+    """
+    analyzer = _NameAnalyzer(modules)
+    try:
+        analyzer.visit(ast.parse(code))
+    except SyntaxError:
+        analyzer.barrier = True
+    return {'reads': analyzer.reads, 'writes': analyzer.writes,
+            'functions': analyzer.functions, 'modules': analyzer.modules,
+            'barrier': analyzer.barrier}
+
+
+def plan_blocks(blocks):
+    """
+    Build the dependency graph between a file's blocks, annotating each
+    block dict in place with:
+      index  its position in the file
+      deps   indices of the earlier blocks that write something it reads
+      leaf   True if no later block reads anything it writes
+      pure   True if its outputs depend only on its deps: it is not a
+             barrier and doesn't call into an imported module
+
+    Calling a function defined earlier counts as reading and writing what
+    the function body does. A block that changes library settings
+    (LIBRARY_STATE) is a barrier, since any later block may print or plot
+    with them. Leaves can run in a fork of the namespace, because nothing
+    they change is seen by another block.
+    """
+    # new_namespace() binds these before the first block
+    modules = {'plt', *NAMESPACE_PACKAGES}
+    functions = {}
+    analyses = []
+    for index, block in enumerate(blocks):
+        analysis = analyze_block(block['code'], modules)
+        modules |= analysis['modules']
+        functions.update(analysis['functions'])
+        reads, writes = set(analysis['reads']), set(analysis['writes'])
+        pending, seen = [name for name in reads if name in functions], set()
+        while pending:
+            name = pending.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            called_reads, called_writes = functions[name]
+            reads |= called_reads
+            writes |= called_writes
+            pending.extend(n for n in called_reads if n in functions)
+        barrier = analysis['barrier'] or LIBRARY_STATE in writes
+        analyses.append((reads, writes, barrier))
+        block['index'] = index
+        block['deps'] = [
+            earlier for earlier, (_, earlier_writes, earlier_barrier) in enumerate(analyses[:-1])
+            if barrier or earlier_barrier or earlier_writes & reads
+        ]
+        block['pure'] = not barrier and LIBRARY_STATE not in reads
+
+    dependents = {index: False for index in range(len(blocks))}
+    for block in blocks:
+        for dep in block['deps']:
+            dependents[dep] = True
+    for block, (_, _, barrier) in zip(blocks, analyses):
+        block['leaf'] = not barrier and not dependents[block['index']]
+    return blocks
+
+
+def needed_blocks(blocks, missing):
+    """Indices of the blocks to run so that every index in missing can run."""
+    needed, pending = set(), list(missing)
+    while pending:
+        index = pending.pop()
+        if index not in needed:
+            needed.add(index)
+            pending.extend(blocks[index]['deps'])
+    return needed
+
+
+def _hash_block_inputs(h, code, working_dir):
+    """Add a block's code, data files and project modules to hash h."""
+    h.update(b'\0block\0')
+    h.update(code.encode('utf-8'))
+    for rel_path in referenced_data_files(code, working_dir):
+        h.update(f"\0data\0{rel_path}\0".encode('utf-8'))
+        h.update(sha256_file(Path(working_dir) / rel_path).encode('ascii'))
+    for rel_path in referenced_modules(code):
+        h.update(f"\0module\0{rel_path}\0".encode('utf-8'))
+        h.update(sha256_file(PROJECT_ROOT / rel_path).encode('ascii'))
+
+
+def block_prefix_keys(blocks, working_dir):
+    """
+    One key per block that hashes the whole prefix: the environment, the
+    chapter location, and the code, data files and project modules of
+    every block up to and including this one. Identifies a namespace state
+    (kernel snapshots).
+    """
+    h = hashlib.sha256()
+    h.update(environment_fingerprint().encode('utf-8'))
+    h.update(project_relative(working_dir).encode('utf-8'))
+
+    keys = []
+    for block in blocks:
+        _hash_block_inputs(h, block['code'], working_dir)
+        keys.append(h.copy().hexdigest())
+    return keys
+
+
+def block_cache_keys(blocks, working_dir):
+    """
+    Compute one cache key per block of a plan_blocks() plan: the
+    environment, the chapter location, the block's code, data files and
+    project modules, the keys of the blocks it depends on and the key of
+    the last block before it that isn't pure. That key hashes every impure
+    block before it in turn, so library state set up anywhere upstream is
+    covered. Editing a pure block only changes its own key and those of
+    the blocks downstream of it.
+    """
+    base = hashlib.sha256()
+    base.update(environment_fingerprint().encode('utf-8'))
+    base.update(project_relative(working_dir).encode('utf-8'))
+
+    keys = []
+    impure = None
+    for block in blocks:
+        h = base.copy()
+        _hash_block_inputs(h, block['code'], working_dir)
+        for dep in block['deps']:
+            h.update(f"\0dep\0{keys[dep]}".encode('ascii'))
+        if impure is not None:
+            h.update(f"\0impure\0{impure}".encode('ascii'))
+        keys.append(h.hexdigest())
+        if not block['pure']:
+            impure = keys[-1]
+    return keys
+
+
+class ExecutionCache:
+    """
+    On-disk store of block outputs keyed by block_cache_keys().
+    Entries are JSON files; figure bytes are stored once per content hash.
+    """
+
+    def __init__(self, root=EXEC_CACHE_DIR):
+        self.root = Path(root)
+
+    def _entry_path(self, key):
+        return self.root / "entries" / key[:2] / f"{key}.json"
+
+    def _blob_path(self, digest):
+        return self.root / "blobs" / digest[:2] / digest
+
+    def load(self, key):
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key, output, working_dir):
+        """Store a successful block's output and the figures it saved."""
+        if output['error'] is not None:
+            return
+        entry = {'output': {k: output[k] for k in ('stdout', 'figures', 'error')},
+                 'figures': {}}
+        for rel_path in output['figures']:
+            fig_file = Path(working_dir) / rel_path
+            if not fig_file.is_file():
+                return
+            data = fig_file.read_bytes()
+            digest = sha256_bytes(data)
+            blob = self._blob_path(digest)
+            if not blob.exists():
+                self._write_atomic(blob, data)
+            entry['figures'][rel_path] = digest
+
+        self._write_atomic(self._entry_path(key), json.dumps(entry).encode('utf-8'))
+
+    @staticmethod
+    def _write_atomic(path, data):
+        # Parallel workers may write the same blob; never expose a partial file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def restore_figures(self, entry, working_dir):
+        """
+        Put cached figures back in the chapter directory.
+        Returns False if a blob is missing (the entry is then unusable).
+        """
+        for rel_path, digest in entry['figures'].items():
+            target = Path(working_dir) / rel_path
+            if target.is_file() and sha256_file(target) == digest:
+                continue
+            blob = self._blob_path(digest)
+            if not blob.is_file():
+                return False
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(blob.read_bytes())
+        return True
+
+
+def replay_cached_outputs(blocks, working_dir, cache):
+    """
+    Look up every block of a plan_blocks() plan in the cache.
+    Returns (keys, outputs) with None in outputs for each block that
+    missed; the figures of the blocks that hit are restored.
+    """
+    keys = block_cache_keys(blocks, working_dir)
+    outputs = []
+    for key in keys:
+        entry = cache.load(key)
+        if entry is not None and not cache.restore_figures(entry, working_dir):
+            entry = None
+        outputs.append(entry['output'] if entry is not None else None)
+    return keys, outputs
+
+
+class NamespaceCheckpoints:
+    """
+    On-disk namespace checkpoints (see CHECKPOINT_DIR).
+
+    Blocks carry a 'checkpoint' (name, key) pair from process_qmd_file():
+    name identifies the block position in its file, key is its
+    block_prefix_keys() value. A checkpoint records the namespace after
+    that block, which blocks had run in it, and their outputs. Arrays are
+    stored as .npz, DataFrames as Parquet (when pyarrow is installed),
+    modules by name and everything else pickled (with cloudpickle when
+    available, so chapter-defined functions survive). Each value is stored
+    once per content hash, so unchanged values aren't written again.
+    """
+
+    def __init__(self, root=CHECKPOINT_DIR):
+        self.root = Path(root)
+
+    def _meta_path(self, name):
+        return self.root / f"{name}.json"
+
+    def _object_path(self, digest):
+        return self.root / "objects" / digest[:2] / digest
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _parquet_available():
+        return importlib.util.find_spec('pyarrow') is not None
+
+    def _dump_value(self, value):
+        """Return (format, bytes) for a namespace value."""
+        np = sys.modules.get('numpy')
+        pd = sys.modules.get('pandas')
+        buffer = BytesIO()
+        if np is not None and type(value) is np.ndarray and not value.dtype.hasobject:
+            np.savez(buffer, value=value)
+            return 'npz', buffer.getvalue()
+        if pd is not None and type(value) is pd.DataFrame and self._parquet_available():
+            try:
+                value.to_parquet(buffer)
+                return 'parquet', buffer.getvalue()
+            except Exception:
+                pass  # e.g. non-string column names: pickle it instead
+        dumps = cloudpickle.dumps if cloudpickle is not None else pickle.dumps
+        return 'pickle', dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load_value(fmt, data):
+        if fmt == 'npz':
+            import numpy as np
+            with np.load(BytesIO(data)) as archive:
+                return archive['value']
+        if fmt == 'parquet':
+            import pandas as pd
+            return pd.read_parquet(BytesIO(data))
+        return pickle.loads(data)
+
+    def save(self, block, namespace, executed, outputs, wall):
+        """
+        Checkpoint namespace after block. executed lists the indices of the
+        blocks that ran in it, outputs maps each to its output and wall is
+        their total run time. Returns False if some value couldn't be
+        stored (no checkpoint is written then).
+        """
+        name, key = block['checkpoint']
+        started = time.perf_counter()
+        names, first_name = {}, {}
+        unsaved = []
+        for var, value in namespace.items():
+            if var == '__builtins__':
+                continue
+            if id(value) in first_name:
+                # Keep aliases pointing at one object
+                names[var] = ['alias', first_name[id(value)]]
+                continue
+            first_name[id(value)] = var
+            if isinstance(value, types.ModuleType):
+                names[var] = ['module', value.__name__]
+                continue
+            try:
+                fmt, data = self._dump_value(value)
+            except Exception:
+                unsaved.append(var)
+                continue
+            digest = sha256_bytes(data)
+            path = self._object_path(digest)
+            if not path.exists():
+                write_if_changed(path, data)
+            names[var] = [fmt, digest]
+
+        if unsaved:
+            print(f"Warning: not checkpointing after block {block['index'] + 1}: "
+                  f"can't save {', '.join(sorted(unsaved))}", file=sys.stderr)
+            return False
+        meta = {
+            'version': CHECKPOINT_VERSION,
+            'key': key,
+            'executed': sorted(executed),
+            'outputs': {str(index): {k: output[k] for k in ('stdout', 'figures', 'error')}
+                        for index, output in outputs.items()},
+            'wall': wall,
+            'save': time.perf_counter() - started,
+            'names': names,
+        }
+        write_if_changed(self._meta_path(name), json.dumps(meta).encode('utf-8'))
+        return True
+
+    def _load_meta(self, block):
+        name, key = block['checkpoint']
+        try:
+            with open(self._meta_path(name), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('version') != CHECKPOINT_VERSION or meta.get('key') != key:
+            return None
+        return meta
+
+    def _load_namespace(self, meta):
+        namespace = new_namespace()
+        aliases = {}
+        for var, (fmt, ref) in meta['names'].items():
+            if fmt == 'alias':
+                aliases[var] = ref
+            elif fmt == 'module':
+                namespace[var] = importlib.import_module(ref)
+            else:
+                namespace[var] = self._load_value(fmt, self._object_path(ref).read_bytes())
+        for var, ref in aliases.items():
+            namespace[var] = namespace[ref]
+        return namespace
+
+    def resume(self, blocks, working_dir):
+        """
+        Find the deepest checkpoint among blocks (the blocks about to run,
+        in order) that every one of them up to that point ran in, and that
+        is slower to re-run than to load. Returns (count, namespace,
+        outputs, meta) for the first count blocks, or None.
+        """
+        for position in range(len(blocks) - 1, -1, -1):
+            block = blocks[position]
+            if 'checkpoint' not in block:
+                continue
+            meta = self._load_meta(block)
+            if meta is None or meta['wall'] <= meta['save']:
+                continue
+            covered = blocks[:position + 1]
+            if not all(str(b['index']) in meta['outputs'] for b in covered):
+                continue
+            outputs = [meta['outputs'][str(b['index'])] for b in covered]
+            if not all((Path(working_dir) / rel_path).is_file()
+                       for output in outputs for rel_path in output['figures']):
+                continue
+            try:
+                namespace = self._load_namespace(meta)
+            except Exception as e:
+                print(f"Warning: could not load checkpoint after block {block['index'] + 1}: {e}",
+                      file=sys.stderr)
+                continue
+            # Refresh the mtime: collect_garbage() removes unused checkpoints
+            os.utime(self._meta_path(block['checkpoint'][0]))
+            return position + 1, namespace, outputs, meta
+        return None
+
+    def collect_garbage(self, max_age=CHECKPOINT_MAX_AGE):
+        """
+        Remove checkpoints unused for max_age days and stored values no
+        checkpoint refers to. Returns the number of bytes freed.
+        """
+        if not self.root.is_dir():
+            return 0
+        now = time.time()
+        freed = 0
+        referenced = set()
+        for path in self.root.glob("*.json"):
+            try:
+                if now - path.stat().st_mtime > max_age * 86400:
+                    freed += path.stat().st_size
+                    path.unlink()
+                    continue
+                meta = json.loads(path.read_text(encoding='utf-8'))
+                referenced.update(ref for fmt, ref in meta['names'].values()
+                                  if fmt not in ('alias', 'module'))
+            except (OSError, ValueError, KeyError):
+                continue
+        for path in self.root.glob("objects/*/*"):
+            try:
+                # A checkpoint being written may not have its JSON yet
+                if path.name not in referenced and now - path.stat().st_mtime > 3600:
+                    freed += path.stat().st_size
+                    path.unlink()
+            except OSError:
+                continue
+        return freed
+
+
+def new_namespace():
+    """
+    Create the shared namespace for all blocks in a file.
     """
-    # Shared namespace for all blocks in the file
     namespace = {'__name__': '__main__'}
 
     # Pre-import matplotlib with Agg backend and make plt.show() a no-op
@@ -95,12 +1094,292 @@ def execute_code_blocks(blocks, working_dir):
         plt.switch_backend('Agg')
         namespace['plt'] = plt
         # Also inject a no-op show function in case code calls plt.show()
-        original_show = plt.show
         plt.show = lambda *args, **kwargs: None
     except ImportError:
         pass
 
+    # Shared helpers (dact.balance, ...) without an import; submodules load on first use
+    for package in NAMESPACE_PACKAGES:
+        namespace[package] = importlib.import_module(package)
+
+    return namespace
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@functools.lru_cache(maxsize=None)
+def _original_savefig():
+    # Looked up once, so a process forked while a capture is installed
+    # (kernel snapshots) still wraps matplotlib's own method
+    from matplotlib.figure import Figure
+    return Figure.savefig
+
+
+def _compress_png(data):
+    """Recompress an uncompressed PNG from savefig, keeping its metadata."""
+    from PIL import Image, PngImagePlugin
+    with Image.open(BytesIO(data)) as image:
+        info = PngImagePlugin.PngInfo()
+        for key, value in image.info.items():
+            if isinstance(value, str):
+                info.add_text(key, value)
+        out = BytesIO()
+        image.save(out, format='png', pnginfo=info, dpi=image.info.get('dpi'))
+    return out.getvalue()
+
+
+class FigureCapture:
+    """
+    Record the figures each block produces through matplotlib itself.
+
+    While installed, Figure.savefig (and so plt.savefig) to a path renders
+    into memory and records the path; compressing PNGs and writing files
+    happens in a thread pool, and a file is only rewritten if its bytes
+    changed. At the end of a block, figures with axes that are still open
+    but were never saved are saved as well, and they and the figures the
+    block saved are closed, as in Jupyter. Figures without axes stay open
+    (a block can set one up for the next to draw on). Call drain() to wait
+    for pending writes.
+    """
+
+    def __init__(self, workers=FIGURE_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='figures')
+        self.pending = {}
+        self.saved = []
+        self.paths = []
+        self.savefig_time = 0.0
+        self._installed = None
+
+    def install(self):
+        try:
+            from matplotlib.figure import Figure
+        except ImportError:
+            return
+        original = _original_savefig()
+        capture = self
+
+        @functools.wraps(original)
+        def savefig(fig, fname, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                if not isinstance(fname, (str, os.PathLike)):
+                    return original(fig, fname, *args, **kwargs)
+                return capture._savefig(original, fig, Path(fname), args, kwargs)
+            finally:
+                capture.savefig_time += time.perf_counter() - started
+
+        Figure.savefig = savefig
+        self._installed = (Figure, original)
+
+    def uninstall(self):
+        if self._installed is not None:
+            Figure, original = self._installed
+            Figure.savefig = original
+            self._installed = None
+
+    def _savefig(self, original, fig, path, args, kwargs):
+        import matplotlib
+        fmt = kwargs.get('format')
+        if fmt is None:
+            if path.suffix:
+                fmt = path.suffix[1:].lower()
+            else:
+                # Matplotlib appends the default format's extension
+                fmt = matplotlib.rcParams['savefig.format']
+                path = path.with_name(f"{path.name}.{fmt}")
+
+        # Rendering has to happen now, before the block changes the figure;
+        # PNG compression is left to the pool
+        deferred = fmt == 'png' and 'pil_kwargs' not in kwargs
+        render_kwargs = dict(kwargs, format=fmt)
+        if deferred:
+            render_kwargs['pil_kwargs'] = {'compress_level': 0}
+        buffer = BytesIO()
+        original(fig, buffer, *args, **render_kwargs)
+
+        target = Path.cwd() / path
+        previous = self.pending.get(target)
+        if previous is not None:
+            previous.result()  # keep writes to one path in order
+        self.pending[target] = self.pool.submit(self._write, target, buffer.getvalue(), deferred)
+
+        self.saved.append(fig)
+        if not path.is_absolute() and '..' not in path.parts:
+            rel_path = path.as_posix()
+            if rel_path not in self.paths:
+                self.paths.append(rel_path)
+
+    @staticmethod
+    def _write(target, data, deferred):
+        if deferred:
+            data = _compress_png(data)
+        return write_if_changed(target, data)
+
+    def start_block(self):
+        self.saved = []
+        self.paths = []
+        self.savefig_time = 0.0
+
+    def finish_block(self, code, autosave=True):
+        """
+        Save the block's unsaved open figures (if autosave), close them and
+        the figures it saved, and return the paths of the figures the block
+        produced.
+        """
+        plt = sys.modules.get('matplotlib.pyplot')
+        if plt is not None:
+            # Not plt.figure(num), which would change the current figure
+            from matplotlib._pylab_helpers import Gcf
+            managers = sorted(Gcf.get_all_fig_managers(), key=lambda manager: manager.num)
+            figures = [manager.canvas.figure for manager in managers]
+            saved = [fig for fig in figures if any(fig is s for s in self.saved)]
+            unsaved = [fig for fig in figures
+                       if fig.get_axes() and not any(fig is s for s in saved)]
+            if autosave:
+                code_hash = sha256_bytes(code.encode('utf-8'))[:12]
+                for n, fig in enumerate(unsaved, 1):
+                    fig.savefig(f"figures/{AUTO_FIGURE_PREFIX}{code_hash}-{n}.png",
+                                dpi=150, bbox_inches='tight')
+            for fig in saved + unsaved:
+                plt.close(fig)
+        paths = self.paths
+        self.saved = []
+        self.paths = []
+        return paths
+
+    def drain(self):
+        """Wait for pending figure writes; report (don't raise) failures."""
+        for target, future in self.pending.items():
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Warning: could not write figure {target}: {e}", file=sys.stderr)
+        self.pending = {}
+
+    def close(self):
+        self.drain()
+        self.pool.shutdown()
+
+
+def _failure_output(message, wall):
+    """Error output for a block that was stopped or lost its process."""
+    return {'stdout': None, 'figures': [], 'error': message,
+            'metrics': {'wall': wall, 'cpu': None, 'peak_rss': None, 'rss_growth': None,
+                        'tracemalloc_peak': None, 'savefig': 0.0}}
+
+
+def _fork_block(block, namespace, trace_memory, timeout):
+    """
+    Run a leaf block in a forked child, on a copy of the namespace as it is
+    now. The child is killed by SIGALRM after timeout seconds. Returns the
+    handle to pass to _collect_forked_block().
+    """
+    fd, result_path = tempfile.mkstemp(prefix='qmd-block-', suffix='.pickle')
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            if timeout:
+                signal.signal(signal.SIGALRM, signal.SIG_DFL)
+                signal.alarm(max(1, round(timeout)))
+            log = StringIO()
+            with redirect_stderr(log):
+                output, = execute_code_blocks([block], os.getcwd(), namespace,
+                                              trace_memory=trace_memory)
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((output, log.getvalue()), f)
+        finally:
+            os._exit(0)
+    os.close(fd)
+    return pid, result_path, time.perf_counter()
+
+
+def _collect_forked_block(handle, timeout, wait=True):
+    """
+    Reap a _fork_block() child and return its output, or None if wait is
+    False and it is still running. The child's stderr is replayed here.
+    """
+    pid, result_path, started = handle
+    reaped, status = os.waitpid(pid, 0 if wait else os.WNOHANG)
+    if reaped == 0:
+        return None
+    try:
+        with open(result_path, 'rb') as f:
+            output, log = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        if os.WIFSIGNALED(status) and os.WTERMSIG(status) == signal.SIGALRM:
+            message = f"Block exceeded the per-block time limit of {timeout}s and was stopped."
+        else:
+            message = (f"The process executing this block exited unexpectedly "
+                       f"(status {status}); it may have run out of memory.")
+        output = _failure_output(message, time.perf_counter() - started)
+        log = f"Warning: {message}\n"
+    finally:
+        os.unlink(result_path)
+    sys.stderr.write(log)
+    return output
+
+
+def execute_code_blocks(blocks, working_dir, namespace=None, on_block=None,
+                        trace_memory=False, capture=None, branches=1, block_timeout=None,
+                        on_start=None, on_output=None, checkpoints=None):
+    """
+    Execute code blocks in sequence, capturing output.
+    Returns list of outputs (one per block), each with a 'metrics' dict:
+    wall and CPU seconds, process peak RSS after the block, time spent in
+    savefig and, with trace_memory, the tracemalloc peak during the block.
+
+    With branches > 1, blocks that plan_blocks() marked as leaves run in a
+    forked copy of the namespace (at most branches - 1 at a time, each
+    stopped after block_timeout seconds) while the following blocks carry
+    on here. Nothing later reads what a leaf writes, so every block sees
+    the namespace it would have seen running in order.
+
+    namespace continues from an earlier run instead of starting fresh.
+    on_block(index, namespace, outputs) is called after each block run
+    here, once its figures are written; outputs of leaves still running
+    are None. on_start(index) is called when a block starts here and
+    on_output(index, output) when any block's output is ready. A caller
+    passing its own FigureCapture is responsible for draining it.
+
+    With checkpoints (a NamespaceCheckpoints) and no namespace given, the
+    run starts from the deepest usable checkpoint, taking the outputs of
+    the blocks before it from there, and the namespace is checkpointed
+    after blocks run here (see CHECKPOINT_INTERVAL).
+    """
     outputs = []
+    forked = {}
+    # Blocks whose effects are in namespace, for checkpoints
+    executed, wall_total, since_checkpoint = {}, 0.0, 0.0
+    checkpointing = checkpoints is not None
+    if checkpointing and namespace is None:
+        resumed = checkpoints.resume(blocks, working_dir)
+        if resumed is not None:
+            count, namespace, outputs, meta = resumed
+            executed = {int(index): output for index, output in meta['outputs'].items()}
+            wall_total = meta['wall']
+            print(f"  Resuming from checkpoint after block {blocks[count - 1]['index'] + 1} "
+                  f"(saves {meta['wall']:.1f}s)", file=sys.stderr)
+            if on_output is not None:
+                for index, output in enumerate(outputs):
+                    on_output(index, output)
+    if namespace is None:
+        namespace = new_namespace()
+    can_fork = branches > 1 and hasattr(os, 'fork')
+    own_capture = capture is None
+    if own_capture:
+        capture = FigureCapture()
+    capture.install()
+    if trace_memory:
+        tracemalloc.start()
 
     # Change to working directory for relative paths (figures)
     original_dir = os.getcwd()
@@ -110,10 +1389,39 @@ def execute_code_blocks(blocks, working_dir):
     figures_dir = Path('figures')
     figures_dir.mkdir(exist_ok=True)
 
+    def collect(index, wait):
+        output = _collect_forked_block(forked[index], block_timeout, wait)
+        if output is not None:
+            del forked[index]
+            outputs[index] = output
+            if on_output is not None:
+                on_output(index, output)
+
     try:
-        for block in blocks:
+        for block in blocks[len(outputs):]:
+            for index in list(forked):
+                collect(index, wait=False)
+
+            if can_fork and block.get('leaf'):
+                while len(forked) >= branches - 1:
+                    collect(min(forked), wait=True)
+                # No figure writes in flight across the fork
+                capture.drain()
+                outputs.append(None)
+                forked[len(outputs) - 1] = _fork_block(block, namespace, trace_memory,
+                                                       block_timeout)
+                continue
+
+            if on_start is not None:
+                on_start(len(outputs))
             code = block['code']
             stdout_capture = StringIO()
+            capture.start_block()
+            if trace_memory:
+                tracemalloc.reset_peak()
+            rss_before = peak_rss_bytes()
+            started_cpu = time.process_time()
+            started_wall = time.perf_counter()
 
             try:
                 # Capture stdout
@@ -122,105 +1430,475 @@ def execute_code_blocks(blocks, working_dir):
 
                 output = stdout_capture.getvalue()
 
-                # Check for savefig to add image reference
-                fig_path = extract_savefig_path(code)
-
                 outputs.append({
                     'stdout': output.strip() if output.strip() else None,
-                    'figure': fig_path,
+                    'figures': capture.finish_block(code),
                     'error': None
                 })
 
             except Exception as e:
                 error_msg = f"Error executing code block:\n{traceback.format_exc()}"
+                capture.finish_block(code, autosave=False)
                 outputs.append({
                     'stdout': stdout_capture.getvalue().strip() or None,
-                    'figure': None,
+                    'figures': [],
                     'error': error_msg
                 })
                 print(f"Warning: {error_msg}", file=sys.stderr)
+
+            rss_after = peak_rss_bytes()
+            outputs[-1]['metrics'] = {
+                'wall': time.perf_counter() - started_wall,
+                'cpu': time.process_time() - started_cpu,
+                'peak_rss': rss_after,
+                'rss_growth': (rss_after - rss_before) if rss_after is not None else None,
+                'tracemalloc_peak': tracemalloc.get_traced_memory()[1] if trace_memory else None,
+                'savefig': capture.savefig_time,
+            }
+            if on_output is not None:
+                on_output(len(outputs) - 1, outputs[-1])
+
+            if checkpointing and 'checkpoint' in block:
+                executed[block['index']] = outputs[-1]
+                wall_total += outputs[-1]['metrics']['wall']
+                since_checkpoint += outputs[-1]['metrics']['wall']
+                if (since_checkpoint >= CHECKPOINT_INTERVAL and outputs[-1]['error'] is None
+                        and len(outputs) < len(blocks)):
+                    # A value that couldn't be saved usually stays around
+                    checkpointing = checkpoints.save(block, namespace, executed.keys(),
+                                                     executed, wall_total)
+                    since_checkpoint = 0.0
+
+            if on_block is not None:
+                # Callers fork here (kernel snapshots): no writes in flight
+                capture.drain()
+                on_block(len(outputs) - 1, namespace, outputs)
+
+        for index in sorted(forked):
+            collect(index, wait=True)
     finally:
+        # Only left over if interrupted
+        for pid, result_path, _ in forked.values():
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            os.unlink(result_path)
+        capture.uninstall()
+        if own_capture:
+            capture.close()
         os.chdir(original_dir)
+        if trace_memory:
+            tracemalloc.stop()
 
     return outputs
 
 
-def insert_outputs(content, blocks, outputs):
+def _supervised_worker(conn, working_dir, memory_limit):
     """
-    Insert output blocks after each code block.
-    Works backwards to preserve positions.
+    Child side of execute_code_blocks_supervised(): run the blocks it is
+    sent, reporting each block's start and output (with the stderr text
+    written since the last message) as they happen.
     """
-    # Process in reverse order to preserve positions
-    for block, output in reversed(list(zip(blocks, outputs))):
-        insert_pos = block['end']
+    if hasattr(os, 'setpgrp'):
+        # Own process group, so the supervisor can stop forked leaves too
+        os.setpgrp()
+    if memory_limit and resource is not None:
+        limit = memory_limit * 2**20
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError) as e:
+            print(f"Warning: could not apply memory limit: {e}", file=sys.stderr)
 
-        # Build output section
-        output_parts = []
+    try:
+        blocks, trace_memory, branches, block_timeout, checkpoints = conn.recv()
+    except EOFError:
+        return
+
+    log = StringIO()
+
+    def send(*message):
+        conn.send(message + (log.getvalue(),))
+        log.seek(0)
+        log.truncate()
 
-        # Add stdout if present
-        if output['stdout']:
-            output_parts.append(f"```\n{output['stdout']}\n```")
+    with redirect_stderr(log):
+        # Figures are written in the background; finish before reporting done
+        capture = FigureCapture()
+        try:
+            execute_code_blocks(blocks, working_dir, trace_memory=trace_memory,
+                                capture=capture, branches=branches,
+                                block_timeout=block_timeout, checkpoints=checkpoints,
+                                on_start=lambda index: send('start', index),
+                                on_output=lambda index, output: send('done', index, output))
+        finally:
+            capture.close()
+    send('finished')
 
-        # Add figure reference if present
-        if output['figure']:
-            # Extract just filename for alt text
-            fig_name = Path(output['figure']).stem.replace('_', ' ').title()
-            output_parts.append(f"\n![{fig_name}]({output['figure']})")
 
-        # Add error if present
-        if output['error']:
-            output_parts.append(f"```\n[Execution Error]\n{output['error']}\n```")
+def _limit_error(message):
+    return {'stdout': None, 'figures': [], 'error': message}
 
-        if output_parts:
-            output_section = f"\n\n{OUTPUT_START}\n" + "\n".join(output_parts) + f"\n{OUTPUT_END}"
-            content = content[:insert_pos] + output_section + content[insert_pos:]
 
-    return content
+def _stop_worker(process):
+    """Kill a supervised worker and the leaves it forked."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (AttributeError, OSError):
+        process.kill()
+    process.join()
 
 
-def process_qmd_file(qmd_path):
+def execute_code_blocks_supervised(blocks, working_dir, limits, trace_memory=False,
+                                   branches=1, checkpoints=None):
+    """
+    Like execute_code_blocks(), but run the blocks in a child process that
+    is killed if a block exceeds limits['block_timeout'] seconds or the file
+    exceeds limits['file_timeout'] seconds. limits['memory_limit'] (MB)
+    caps the child's address space, so a block that allocates too much gets
+    a MemoryError. A block that is stopped, or that takes the child down,
+    gets an error output. The blocks that hadn't finished are reported as
+    not executed, because the namespace they depend on is gone. Leaves
+    forked by the child enforce the per-block limit themselves, and only
+    lose their own output.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+    parent_conn, child_conn = context.Pipe()
+    process = context.Process(target=_supervised_worker,
+                              args=(child_conn, str(working_dir), limits.get('memory_limit')))
+    process.start()
+    child_conn.close()
+
+    block_timeout = limits.get('block_timeout')
+    file_timeout = limits.get('file_timeout')
+    started = time.monotonic()
+    deadline = started + file_timeout if file_timeout else None
+
+    outputs = [None] * len(blocks)
+    running = {}
+    failure = None
+    finished = False
+    try:
+        parent_conn.send((blocks, trace_memory, branches, block_timeout, checkpoints))
+        while not finished:
+            # The next limit to run out: a running block's, or the file's
+            expiries = [(since + block_timeout, index, f"per-block time limit of {block_timeout}s")
+                        for index, since in running.items()] if block_timeout else []
+            if deadline is not None:
+                expiries.append((deadline, None, f"per-file time limit of {file_timeout}s"))
+            expiry = min(expiries, key=lambda item: item[0]) if expiries else None
+            timeout = max(expiry[0] - time.monotonic(), 0) if expiry else None
+
+            if not parent_conn.poll(timeout):
+                _, index, limit_name = expiry
+                failure = (index, f"Block exceeded the {limit_name} and was stopped.")
+                break
+            try:
+                kind, *payload, log = parent_conn.recv()
+            except EOFError:
+                process.join(5)
+                failure = (None, f"The worker process executing this block exited unexpectedly "
+                                 f"(exit code {process.exitcode}); it may have run out of memory.")
+                break
+            sys.stderr.write(log)
+            if kind == 'start':
+                running[payload[0]] = time.monotonic()
+            elif kind == 'done':
+                index, output = payload
+                running.pop(index, None)
+                outputs[index] = output
+            else:
+                finished = True
+    finally:
+        if finished:
+            process.join()
+        else:
+            _stop_worker(process)
+        parent_conn.close()
+
+    if failure is not None:
+        index, message = failure
+        if index is None:
+            index = min(running) if running else next(
+                (i for i, output in enumerate(outputs) if output is None), None)
+        print(f"Warning: {message}", file=sys.stderr)
+        if index is not None:
+            outputs[index] = _failure_output(message,
+                                             time.monotonic() - running.get(index, started))
+        skipped = _limit_error("Not executed: another block in this file was stopped.")
+        outputs = [output if output is not None else dict(skipped) for output in outputs]
+
+    return outputs
+
+
+def make_executor(trace_memory=False, limits=None, branches=1, checkpoints=None):
+    """
+    Return the execute(blocks, working_dir) callable for process_qmd_file():
+    supervised if any limit is set, in-process otherwise. Up to branches
+    blocks of a file run at once, resuming from and writing to checkpoints
+    if given (see execute_code_blocks).
+    """
+    if limits and any(value for value in limits.values()):
+        return functools.partial(execute_code_blocks_supervised, limits=limits,
+                                 trace_memory=trace_memory, branches=branches,
+                                 checkpoints=checkpoints)
+    return functools.partial(execute_code_blocks, trace_memory=trace_memory,
+                             branches=branches, checkpoints=checkpoints)
+
+
+def format_output(output):
+    """Render one block's output as a marked section ('' if there is none)."""
+    output_parts = []
+
+    # Add stdout if present
+    if output['stdout']:
+        output_parts.append(f"```\n{output['stdout']}\n```")
+
+    # Add figure references
+    for figure in output['figures']:
+        # Extract just filename for alt text
+        stem = Path(figure).stem
+        fig_name = "Figure" if stem.startswith(AUTO_FIGURE_PREFIX) else stem.replace('_', ' ').title()
+        output_parts.append(f"\n![{fig_name}]({figure})")
+
+    # Add error if present
+    if output['error']:
+        output_parts.append(f"```\n[Execution Error]\n{output['error']}\n```")
+
+    if not output_parts:
+        return ''
+    return f"\n\n{OUTPUT_START}\n" + "\n".join(output_parts) + f"\n{OUTPUT_END}"
+
+
+def insert_outputs(segments, outputs):
+    """
+    Build the new QMD content from parse_qmd() segments, with each block's
+    output section after it, in one join.
+    """
+    outputs = iter(outputs)
+    parts = []
+    for seg in segments:
+        if isinstance(seg, str):
+            parts.append(seg)
+        else:
+            parts.append(seg['source'])
+            parts.append(format_output(next(outputs)))
+    return ''.join(parts)
+
+
+def prune_auto_figures(working_dir, outputs):
+    """
+    Delete auto-saved figures that no output references any more (their
+    block changed or went away). Each chapter directory holds one QMD file,
+    so everything under its figures/ belongs to these outputs.
+    """
+    referenced = {Path(figure).name for output in outputs for figure in output['figures']}
+    for path in (Path(working_dir) / 'figures').glob(f"{AUTO_FIGURE_PREFIX}*.png"):
+        if path.name not in referenced:
+            path.unlink()
+
+
+def process_qmd_file(qmd_path, cache=None, execute=execute_code_blocks):
     """
     Process a single QMD file: execute Python blocks and insert output.
+    If a cache is given, blocks whose code and inputs are unchanged are
+    replayed from it; execute(blocks, working_dir) runs the ones that
+    missed, along with the blocks they depend on (see plan_blocks). Each
+    block gets the 'checkpoint' name and key NamespaceCheckpoints uses.
+    Returns a result dict ({'path', 'outputs'}), or None if the file has
+    no Python blocks.
     """
     qmd_path = Path(qmd_path)
-    print(f"Processing: {qmd_path.name}")
+    started = time.perf_counter()
+    print(f"Processing: {qmd_path.parent.name}/{qmd_path.name}")
 
     with open(qmd_path, 'r', encoding='utf-8') as f:
         content = f.read()
 
-    # Remove any existing auto-generated output
-    content = remove_existing_output(content)
-
-    # Find Python code blocks
-    blocks = find_python_code_blocks(content)
+    # Split into text and Python blocks, dropping existing generated output
+    segments = parse_qmd(content)
+    blocks = segment_blocks(segments)
 
     if not blocks:
         print(f"  No Python code blocks found")
-        return False
+        return None
 
     print(f"  Found {len(blocks)} Python code blocks")
 
     # Execute code blocks
     working_dir = qmd_path.parent
-    outputs = execute_code_blocks(blocks, working_dir)
+    plan_blocks(blocks)
+    file_id = sha256_bytes(project_relative(qmd_path).encode('utf-8'))[:12]
+    for block, key in zip(blocks, block_prefix_keys(blocks, working_dir)):
+        block['checkpoint'] = (f"{file_id}-{block['index']:03d}", key)
+    outputs = [None] * len(blocks)
+    if cache is not None:
+        keys, outputs = replay_cached_outputs(blocks, working_dir, cache)
+    missing = [index for index, output in enumerate(outputs) if output is None]
+    if missing:
+        status = 'executed'
+        needed = needed_blocks(blocks, missing)
+        run = [block for block in blocks if block['index'] in needed]
+        if len(run) < len(blocks):
+            print(f"  Replayed {len(blocks) - len(run)} blocks from cache, executing {len(run)}")
+        for block, output in zip(run, execute(run, working_dir)):
+            outputs[block['index']] = output
+            if cache is not None:
+                cache.store(keys[block['index']], output, working_dir)
+    else:
+        status = 'cached'
+        print(f"  Replayed {len(blocks)} blocks from cache")
+    if all(output['error'] is None for output in outputs):
+        prune_auto_figures(working_dir, outputs)
 
     # Insert outputs
-    new_content = insert_outputs(content, blocks, outputs)
+    new_content = insert_outputs(segments, outputs)
 
-    # Write back
-    with open(qmd_path, 'w', encoding='utf-8') as f:
-        f.write(new_content)
+    # Write back, leaving the file (and its mtime) alone if nothing changed
+    changed = write_if_changed(qmd_path, new_content.encode('utf-8'))
 
     # Report
     successful = sum(1 for o in outputs if o['error'] is None)
     with_output = sum(1 for o in outputs if o['stdout'])
-    with_figures = sum(1 for o in outputs if o['figure'])
+    with_figures = sum(len(o['figures']) for o in outputs)
 
     print(f"  Executed: {successful}/{len(blocks)} blocks")
     print(f"  Output blocks added: {with_output}")
     print(f"  Figure references added: {with_figures}")
+    if not changed:
+        print(f"  Unchanged: {qmd_path.name} not rewritten")
 
-    return True
+    block_reports = []
+    for i, (block, output) in enumerate(zip(blocks, outputs)):
+        first_line = next((line.strip() for line in block['code'].splitlines()
+                           if line.strip() and not line.strip().startswith('#')), '')
+        block_reports.append({
+            'index': i,
+            'line': block['line'],
+            'summary': first_line[:60],
+            'error': output['error'] is not None,
+            **(output.get('metrics') or {}),
+        })
+
+    return {
+        'path': str(qmd_path),
+        'status': status,
+        'changed': changed,
+        'wall': time.perf_counter() - started,
+        'outputs': outputs,
+        'blocks': block_reports,
+    }
+
+
+class BuildManifest:
+    """
+    Record of each chapter's last build: the hash of its source (with
+    generated output stripped), the data files and project modules it
+    read, the file it wrote and the figures it produced. A chapter is up to
+    date when all of these still match and the environment and this script
+    are unchanged.
+    """
+
+    def __init__(self, path=BUILD_MANIFEST_PATH):
+        self.path = Path(path)
+        self.environment = sha256_bytes(
+            (environment_fingerprint() + sha256_file(__file__)).encode('utf-8'))
+        self.chapters = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == BUILD_MANIFEST_VERSION:
+            self.chapters = data.get('chapters', {})
+
+    @staticmethod
+    def _files_match(hashes, working_dir):
+        for rel_path, digest in hashes.items():
+            path = Path(working_dir) / rel_path
+            if not path.is_file() or sha256_file(path) != digest:
+                return False
+        return True
+
+    def is_up_to_date(self, qmd_path):
+        qmd_path = Path(qmd_path)
+        entry = self.chapters.get(project_relative(qmd_path))
+        if entry is None or entry.get('environment') != self.environment:
+            return False
+
+        content = qmd_path.read_text(encoding='utf-8')
+        if sha256_bytes(content.encode('utf-8')) != entry['output_hash']:
+            return False
+        source = remove_existing_output(content)
+        if sha256_bytes(source.encode('utf-8')) != entry['source_hash']:
+            return False
+
+        working_dir = qmd_path.parent
+        return (self._files_match(entry['data_files'], working_dir)
+                and self._files_match(entry.get('modules', {}), PROJECT_ROOT)
+                and self._files_match(entry['figures'], working_dir))
+
+    def record(self, qmd_path, outputs):
+        """Record a successful build of qmd_path (as just written to disk)."""
+        qmd_path = Path(qmd_path)
+        key = project_relative(qmd_path)
+        if any(output['error'] is not None for output in outputs):
+            # Failed chapters are always rebuilt
+            self.chapters.pop(key, None)
+            return
+
+        working_dir = qmd_path.parent
+        content = qmd_path.read_text(encoding='utf-8')
+        segments = parse_qmd(content)
+        source = segments_source(segments)
+        data_files, modules = set(), set()
+        for block in segment_blocks(segments):
+            data_files.update(referenced_data_files(block['code'], working_dir))
+            modules.update(referenced_modules(block['code']))
+        figures = {figure for output in outputs for figure in output['figures']}
+
+        self.chapters[key] = {
+            'environment': self.environment,
+            'source_hash': sha256_bytes(source.encode('utf-8')),
+            'output_hash': sha256_bytes(content.encode('utf-8')),
+            'data_files': {p: sha256_file(working_dir / p) for p in sorted(data_files)},
+            'modules': {p: sha256_file(PROJECT_ROOT / p) for p in sorted(modules)},
+            'figures': {p: sha256_file(working_dir / p) for p in sorted(figures)
+                        if (working_dir / p).is_file()},
+        }
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': BUILD_MANIFEST_VERSION, 'chapters': self.chapters},
+                      f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def chapters_changed_since(rev):
+    """
+    Return the set of chapter directories with any file changed since the
+    given git revision, including uncommitted and untracked files.
+    """
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=PROJECT_ROOT, check=True,
+                              capture_output=True, text=True).stdout
+
+    toplevel = Path(git('rev-parse', '--show-toplevel').strip())
+    changed = git('diff', '--name-only', rev, '--', str(QMD_DIR)).splitlines()
+    changed += git('ls-files', '--others', '--exclude-standard', '--', str(QMD_DIR)).splitlines()
+
+    qmd_dir = QMD_DIR.resolve()
+    chapters = set()
+    for name in changed:
+        path = (toplevel / name).resolve()
+        try:
+            rel = path.relative_to(qmd_dir)
+        except ValueError:
+            continue
+        if len(rel.parts) > 1:
+            chapters.add(qmd_dir / rel.parts[0])
+    return chapters
 
 
 def find_qmd_files_with_python():
@@ -233,17 +1911,540 @@ def find_qmd_files_with_python():
             content = f.read()
         if '```python' in content:
             qmd_files.append(qmd_file)
-    return qmd_files
+    return sorted(qmd_files)
+
+
+def _process_qmd_file_isolated(qmd_path, use_cache, trace_memory=False, limits=None,
+                               branches=1, use_checkpoints=False):
+    """
+    Worker entry point for --jobs: process one file in a fresh interpreter,
+    capturing its log so the parent can print it in a deterministic order.
+    Returns (log_text, result) with result as from process_qmd_file().
+    """
+    log = StringIO()
+    with redirect_stdout(log), redirect_stderr(log):
+        try:
+            checkpoints = NamespaceCheckpoints() if use_checkpoints else None
+            execute = make_executor(trace_memory, limits, branches, checkpoints)
+            result = process_qmd_file(qmd_path, ExecutionCache() if use_cache else None, execute)
+        except Exception:
+            print(f"Error processing {qmd_path}:\n{traceback.format_exc()}")
+            result = None
+    return log.getvalue(), result
+
+
+def process_qmd_files_parallel(qmd_files, jobs, use_cache, trace_memory=False, limits=None,
+                               branches=1, use_checkpoints=False):
+    """
+    Process files in a pool of worker processes.
+
+    execute_code_blocks changes the working directory and patches matplotlib,
+    so every chapter gets its own spawned interpreter (one task per worker).
+    Logs are printed in input order regardless of completion order.
+    """
+    context = multiprocessing.get_context('spawn')
+    pool_kwargs = {'max_tasks_per_child': 1} if sys.version_info >= (3, 11) else {}
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context, **pool_kwargs) as pool:
+        futures = [pool.submit(_process_qmd_file_isolated, qmd_file, use_cache,
+                               trace_memory, limits, branches, use_checkpoints)
+                   for qmd_file in qmd_files]
+        for future in futures:
+            log_text, result = future.result()
+            print(log_text, end='')
+            print()
+            results.append(result)
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Warm kernel (--serve) and watch mode (--watch)
+#
+# The kernel is a fork server: it imports the heavy libraries once, then
+# forks a runner per request so every file starts from a clean, already
+# warm interpreter. After each block a runner forks a snapshot process that
+# holds the namespace at that point (copy-on-write) and listens on its own
+# socket. When the file is edited, the kernel finds the last snapshot whose
+# prefix key still matches and asks it to fork the next runner, so only the
+# edited block and its successors execute (fewer, when the cache holds
+# blocks that don't depend on the edit).
+# ---------------------------------------------------------------------------
+
+KERNEL_WARM_IMPORTS = (
+    'numpy', 'pandas', 'matplotlib.pyplot', 'scipy.stats', 'seaborn',
+    'sklearn.linear_model',
+)
+
+# Unix socket paths are limited to ~104 bytes; fall back to the temp dir
+KERNEL_DIR = Path(os.environ.get('QMD_KERNEL_DIR', PROJECT_ROOT / ".cache" / "qmd-kernel"))
+if len(str(KERNEL_DIR)) > 80:
+    KERNEL_DIR = Path(tempfile.gettempdir()) / (
+        "qmd-kernel-" + sha256_bytes(str(PROJECT_ROOT).encode('utf-8'))[:8])
+KERNEL_SOCKET = KERNEL_DIR / "kernel.sock"
+
+# Snapshots exit on their own once the kernel that owns them is gone
+SNAPSHOT_IDLE_CHECK = 5.0
+
+_kernel_pid = None
+_kernel_listener = None
+_kernel_branches = 1
+
+
+def _send_json(sock, message, fds=()):
+    data = (json.dumps(message) + "\n").encode('utf-8')
+    if fds:
+        socket.send_fds(sock, [data], list(fds))
+    else:
+        sock.sendall(data)
+
+
+def _recv_json(sock, max_fds=0):
+    """Read one newline-terminated JSON message (and any passed fds)."""
+    data, fds = b'', []
+    while not data.endswith(b"\n"):
+        if max_fds:
+            chunk, new_fds, _, _ = socket.recv_fds(sock, 65536, max_fds)
+            fds += new_fds
+        else:
+            chunk = sock.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    message = json.loads(data) if data.strip() else None
+    return (message, fds) if max_fds else message
+
+
+def _connect(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _listen(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(str(path))
+    sock.listen(8)
+    return sock
+
+
+def _snapshot_socket(qmd_path, index):
+    file_id = sha256_bytes(project_relative(qmd_path).encode('utf-8'))[:8]
+    return KERNEL_DIR / f"{file_id}-{index:03d}.sock"
+
+
+def _existing_snapshots(qmd_path):
+    """Return [(index, socket_path)] for qmd_path, highest index first."""
+    prefix = _snapshot_socket(qmd_path, 0).name[:-len("000.sock")]
+    snapshots = []
+    for path in KERNEL_DIR.glob(f"{prefix}*.sock"):
+        try:
+            snapshots.append((int(path.stem[len(prefix):]), path))
+        except ValueError:
+            continue
+    return sorted(snapshots, reverse=True)
+
+
+def _snapshot_call(path, message, fds=()):
+    """Send a command to a snapshot; returns its reply or None if it is gone."""
+    try:
+        sock = _connect(path)
+    except OSError:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        return None
+    with sock:
+        _send_json(sock, message, fds)
+        return _recv_json(sock)
+
+
+def _serve_snapshot(path, key, state):
+    """
+    Run in a forked child after a block: keep its namespace alive and fork
+    a runner from it whenever the kernel asks to resume here. Never returns.
+    """
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+
+    listener = _listen(path)
+    listener.settimeout(SNAPSHOT_IDLE_CHECK)
+    try:
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                try:
+                    os.kill(_kernel_pid, 0)
+                    continue
+                except OSError:
+                    break
+
+            with conn:
+                request, fds = _recv_json(conn, max_fds=1)
+                command = request.get('command') if request else None
+                if command == 'key':
+                    _send_json(conn, {'key': key})
+                elif command == 'resume' and fds:
+                    pid = os.fork()
+                    if pid == 0:
+                        listener.close()
+                        conn.close()
+                        _run_kernel_request(fds[0], request, resume=state)
+                    os.close(fds[0])
+                    os.waitpid(pid, 0)
+                    _send_json(conn, {'ok': True})
+                else:
+                    for fd in fds:
+                        os.close(fd)
+                    _send_json(conn, {'ok': True})
+                    if command == 'quit':
+                        break
+    finally:
+        try:
+            if path.exists():
+                path.unlink()
+        finally:
+            os._exit(0)
+
+
+def _run_kernel_request(client_fd, request, resume=None):
+    """
+    Forked runner: process one file with output streamed to the client.
+    resume is a snapshot state dict to continue from. Never returns.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(client_fd, 1)
+    os.dup2(client_fd, 2)
+    os.close(client_fd)
+    qmd_path = Path(request['path'])
+
+    def execute(blocks, working_dir):
+        # blocks is the part of the file that has to run; the snapshot
+        # namespace only holds blocks that ran in it, not cached or forked ones
+        all_blocks = plan_blocks(find_python_code_blocks(qmd_path.read_text(encoding='utf-8')))
+        keys = block_prefix_keys(all_blocks, working_dir)
+        start, namespace, known, forked = 0, None, {}, set()
+        if resume is not None:
+            index = resume['index']
+            ran = [block for block in blocks if block['index'] <= index]
+            if (index < len(keys) and keys[index] == resume['key']
+                    and all(block['index'] in resume['outputs'] for block in ran)
+                    and all(all_blocks[i]['leaf'] for i in resume['forked'])):
+                start, namespace = len(ran), resume['namespace']
+                known, forked = resume['outputs'], resume['forked']
+                print(f"  Resuming from warm snapshot after block {index + 1}/{len(all_blocks)}")
+        run = blocks[start:]
+
+        def snapshot(i, namespace, outputs):
+            index = run[i]['index']
+            state = {'index': index, 'key': keys[index], 'namespace': namespace,
+                     'outputs': {**known, **{block['index']: output
+                                             for block, output in zip(run, outputs)
+                                             if output is not None}},
+                     'forked': forked | {block['index'] for block in run[:i] if block['leaf']}}
+            sys.stdout.flush()
+            sys.stderr.flush()
+            if os.fork() == 0:
+                _serve_snapshot(_snapshot_socket(qmd_path, index), keys[index], state)
+
+        outputs = execute_code_blocks(run, working_dir, namespace, snapshot,
+                                      branches=_kernel_branches)
+        return [known[block['index']] for block in blocks[:start]] + outputs
+
+    try:
+        cache = ExecutionCache() if request.get('cache', True) else None
+        result = process_qmd_file(qmd_path, cache, execute=execute)
+        if result is not None:
+            manifest = BuildManifest()
+            manifest.record(result['path'], result['outputs'])
+            manifest.save()
+    except Exception:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(0)
+
+
+def _handle_kernel_request(conn, request):
+    """Resume from the deepest matching snapshot, or fork a fresh runner."""
+    qmd_path = Path(request['path']).resolve()
+    request['path'] = str(qmd_path)
+    keys = block_prefix_keys(find_python_code_blocks(qmd_path.read_text(encoding='utf-8')),
+                             qmd_path.parent)
+
+    # Snapshots after the first changed block are stale: retire them,
+    # then resume from the deepest one that still matches
+    for index, path in _existing_snapshots(qmd_path):
+        reply = _snapshot_call(path, {'command': 'key'})
+        if reply is None:
+            continue
+        if index < len(keys) and reply['key'] == keys[index]:
+            if _snapshot_call(path, {**request, 'command': 'resume'},
+                              fds=[conn.fileno()]) is not None:
+                return
+        _snapshot_call(path, {'command': 'quit'})
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        # Only the runner may hold the client connection, or it never sees EOF
+        client_fd = os.dup(conn.fileno())
+        conn.close()
+        _kernel_listener.close()
+        _run_kernel_request(client_fd, request)
+    os.waitpid(pid, 0)
+
+
+def serve_kernel(branches=1):
+    """Run the warm kernel until interrupted."""
+    global _kernel_pid, _kernel_listener, _kernel_branches
+    _kernel_pid = os.getpid()
+    _kernel_branches = branches
+
+    print("Warming up kernel...")
+    for module in KERNEL_WARM_IMPORTS:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            print(f"  (not installed: {module})")
+    new_namespace()
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+
+    _quit_all_snapshots()
+    _kernel_listener = _listen(KERNEL_SOCKET)
+    print(f"Kernel listening on {KERNEL_SOCKET} (Ctrl-C to stop)")
+
+    try:
+        while True:
+            conn, _ = _kernel_listener.accept()
+            with conn:
+                try:
+                    request = _recv_json(conn)
+                    if request and request.get('path'):
+                        print(f"Request: {project_relative(request['path'])}")
+                        _handle_kernel_request(conn, request)
+                except Exception:
+                    traceback.print_exc()
+    except KeyboardInterrupt:
+        print("\nStopping kernel.")
+    finally:
+        _kernel_listener.close()
+        _quit_all_snapshots()
+        try:
+            KERNEL_SOCKET.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _quit_all_snapshots():
+    for path in KERNEL_DIR.glob("*-*.sock"):
+        _snapshot_call(path, {'command': 'quit'})
+
+
+def request_kernel(qmd_path, use_cache=True):
+    """
+    Ask a running kernel to process qmd_path, streaming its log to stdout.
+    Returns False if no kernel is running.
+    """
+    try:
+        sock = _connect(KERNEL_SOCKET)
+    except OSError:
+        return False
+    with sock:
+        _send_json(sock, {'path': str(Path(qmd_path).resolve()), 'cache': use_cache})
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            sys.stdout.buffer.write(chunk)
+            sys.stdout.flush()
+    return True
+
+
+def watch_files(qmd_files, use_cache, interval=0.5):
+    """
+    Re-process files whenever their source (ignoring generated output)
+    changes. Uses the kernel if one is running, otherwise runs in-process.
+    qmd_files is a callable returning the files to watch.
+    """
+    seen = {}
+    print("Watching for changes (Ctrl-C to stop)...")
+    try:
+        while True:
+            for qmd_file in qmd_files():
+                try:
+                    mtime = qmd_file.stat().st_mtime_ns
+                    previous = seen.get(qmd_file)
+                    if previous is not None and previous[0] == mtime:
+                        continue
+                    content = qmd_file.read_text(encoding='utf-8')
+                except OSError:
+                    continue
+                source_hash = sha256_bytes(remove_existing_output(content).encode('utf-8'))
+                seen[qmd_file] = (mtime, source_hash)
+                if previous is None or previous[1] == source_hash:
+                    continue
+
+                started = time.perf_counter()
+                if not request_kernel(qmd_file, use_cache):
+                    cache = ExecutionCache() if use_cache else None
+                    execute = make_executor(
+                        checkpoints=NamespaceCheckpoints() if use_cache else None)
+                    result = process_qmd_file(qmd_file, cache, execute)
+                    if result is not None:
+                        manifest = BuildManifest()
+                        manifest.record(result['path'], result['outputs'])
+                        manifest.save()
+                print(f"  Done in {time.perf_counter() - started:.2f}s\n")
+                # Our own rewrite changes the mtime but not the source hash
+                seen[qmd_file] = (qmd_file.stat().st_mtime_ns, source_hash)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
+
+def write_build_report(path, results, up_to_date, total_wall):
+    """Write the per-chapter, per-block timing report as JSON."""
+    chapters = [{'path': project_relative(qmd_file), 'status': 'up-to-date'}
+                for qmd_file in up_to_date]
+    for result in results:
+        if result is not None:
+            chapters.append({
+                'path': project_relative(result['path']),
+                'status': result['status'],
+                'changed': result['changed'],
+                'wall': result['wall'],
+                'blocks': result['blocks'],
+            })
+    report = {
+        'generated': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'total_wall': total_wall,
+        'chapters': sorted(chapters, key=lambda chapter: chapter['path']),
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+
+def print_slowest_blocks(results, top):
+    """Print the top executed blocks by wall time."""
+    timed = [(result, block) for result in results if result is not None
+             for block in result['blocks'] if block.get('wall') is not None]
+    if not timed or top <= 0:
+        return
+    timed.sort(key=lambda item: item[1]['wall'], reverse=True)
+
+    def seconds(value):
+        return f"{value:7.2f}s" if value is not None else "      -s"
+
+    def megabytes(value):
+        return f"{value / 2**20:7.0f} MB" if value is not None else "      - MB"
+
+    print("Slowest blocks (wall / cpu / peak RSS / savefig):")
+    for result, block in timed[:top]:
+        location = f"{project_relative(result['path'])}:{block['line']}"
+        print(f"  {block['wall']:7.2f}s {seconds(block['cpu'])} {megabytes(block['peak_rss'])}"
+              f" {block['savefig']:6.2f}s  {location}  {block['summary']}")
+    print()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Execute Python code blocks in QMD files and insert their output.")
+    parser.add_argument('qmd_path', nargs='?',
+                        help="QMD file to process (default: every chapter with Python blocks)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always execute, and don't read or write the execution cache "
+                             "or checkpoints")
+    parser.add_argument('--no-checkpoints', action='store_true',
+                        help="don't resume from or write namespace checkpoints")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="number of chapters to process in parallel (0 = one per CPU)")
+    parser.add_argument('--branches', type=int, default=1, metavar='N',
+                        help="run up to N independent blocks of a file at once "
+                             "(default: 1 = strictly in order, 0 = CPUs per file)")
+    parser.add_argument('--since', metavar='GIT_REV',
+                        help="only consider chapters with files changed since this git revision")
+    parser.add_argument('--force', action='store_true',
+                        help="process chapters even if the build manifest says they are up to date")
+    parser.add_argument('--report', default=BUILD_REPORT_PATH, metavar='PATH',
+                        help=f"where to write the JSON timing report (default: {project_relative(BUILD_REPORT_PATH)})")
+    parser.add_argument('--changed-list', metavar='FILE',
+                        help="write the paths of the QMD files this run rewrote to FILE, one per line")
+    parser.add_argument('--top', type=int, default=5, metavar='N',
+                        help="print the N slowest blocks at the end (0 to disable)")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="also record each block's tracemalloc peak (slows execution)")
+    parser.add_argument('--block-timeout', type=float, default=DEFAULT_LIMITS['block_timeout'],
+                        metavar='SECONDS', help="stop a block after this long (0 = no limit)")
+    parser.add_argument('--file-timeout', type=float, default=DEFAULT_LIMITS['file_timeout'],
+                        metavar='SECONDS', help="stop a file's blocks after this long in total (0 = no limit)")
+    parser.add_argument('--memory-limit', type=int, default=DEFAULT_LIMITS['memory_limit'],
+                        metavar='MB', help="address-space cap for the process running the blocks")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--serve', action='store_true',
+                      help="run a warm kernel that keeps libraries imported and per-block snapshots")
+    mode.add_argument('--watch', action='store_true',
+                      help="re-process files when saved (through the kernel if one is running)")
+    args = parser.parse_args(argv)
+    if args.jobs < 0:
+        parser.error("--jobs must be >= 0")
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    if args.branches < 0:
+        parser.error("--branches must be >= 0")
+    args.limits = {
+        'block_timeout': args.block_timeout or None,
+        'file_timeout': args.file_timeout or None,
+        'memory_limit': args.memory_limit or None,
+    }
+    return args
 
 
 def main():
-    if len(sys.argv) > 1:
+    args = parse_args()
+    if args.serve:
+        serve_kernel(args.branches or os.cpu_count() or 1)
+        return
+    if args.watch:
+        if args.qmd_path:
+            watched = [Path(args.qmd_path)]
+            watch_files(lambda: watched, not args.no_cache)
+        else:
+            watch_files(find_qmd_files_with_python, not args.no_cache)
+        return
+
+    started = time.perf_counter()
+    cache = None if args.no_cache else ExecutionCache()
+    checkpoints = None if args.no_cache or args.no_checkpoints else NamespaceCheckpoints()
+    manifest = BuildManifest()
+
+    if args.qmd_path:
         # Process specific file
-        qmd_path = Path(sys.argv[1])
+        qmd_path = Path(args.qmd_path)
         if not qmd_path.exists():
             print(f"Error: File not found: {qmd_path}")
             sys.exit(1)
-        process_qmd_file(qmd_path)
+        qmd_files = [qmd_path]
     else:
         # Process all QMD files with Python blocks
         print("Searching for QMD files with Python code blocks...")
@@ -253,13 +2454,58 @@ def main():
             print("No QMD files with Python code blocks found.")
             return
 
-        print(f"Found {len(qmd_files)} files to process:\n")
+    if args.since:
+        try:
+            changed = chapters_changed_since(args.since)
+        except (OSError, subprocess.CalledProcessError) as e:
+            detail = getattr(e, 'stderr', None) or e
+            print(f"Error: could not diff against {args.since}: {detail}")
+            sys.exit(1)
+        qmd_files = [f for f in qmd_files if Path(f).parent.resolve() in changed]
+        print(f"{len(qmd_files)} of them changed since {args.since}")
 
-        for qmd_file in qmd_files:
-            process_qmd_file(qmd_file)
-            print()
+    up_to_date = []
+    if not args.force:
+        up_to_date = [f for f in qmd_files if manifest.is_up_to_date(f)]
+        for qmd_file in up_to_date:
+            print(f"Up to date: {Path(qmd_file).parent.name}/{Path(qmd_file).name}")
+        qmd_files = [f for f in qmd_files if f not in up_to_date]
+
+    results = []
+    if qmd_files:
+        print(f"Processing {len(qmd_files)} file(s):\n")
+
+        jobs = min(args.jobs, len(qmd_files))
+        branches = args.branches or max(1, (os.cpu_count() or 1) // jobs)
+        if jobs > 1:
+            print(f"Using {jobs} worker processes\n")
+            results = process_qmd_files_parallel(qmd_files, jobs, cache is not None,
+                                                 args.trace_memory, args.limits, branches,
+                                                 checkpoints is not None)
+        else:
+            execute = make_executor(args.trace_memory, args.limits, branches, checkpoints)
+            for qmd_file in qmd_files:
+                results.append(process_qmd_file(qmd_file, cache, execute))
+                print()
+
+        for result in results:
+            if result is not None:
+                manifest.record(result['path'], result['outputs'])
+        manifest.save()
+        if checkpoints is not None:
+            checkpoints.collect_garbage()
+    else:
+        print("Nothing to do.")
 
-        print("Preprocessing complete.")
+    write_build_report(args.report, results, up_to_date, time.perf_counter() - started)
+    changed = [project_relative(result['path']) for result in results
+               if result is not None and result['changed']]
+    if args.changed_list:
+        Path(args.changed_list).write_text(''.join(f"{path}\n" for path in changed),
+                                           encoding='utf-8')
+    print_slowest_blocks(results, args.top)
+    print(f"Rewrote {len(changed)} file(s)" + ''.join(f"\n  {path}" for path in changed))
+    print("Preprocessing complete.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,715 @@
+#!/usr/bin/env python3
+"""
+Render the manim animations under public/assets/*/animations/.
+
+This script:
+1. Finds every Scene subclass in the animation scripts (by parsing them,
+   so listing works without manim installed)
+2. Renders each scene under a named quality profile (see PROFILES) in its
+   own manim process (see render-scene.py), several at a time
+3. Puts the videos where the site serves them: publish renders replace
+   public/assets/<chapter>/animations/<name>.mp4, draft and review renders
+   go to .cache/renders/<profile>/<chapter>/
+
+A file with a single scene renders to <file name>.mp4, a file with several
+to <Scene name>.mp4. Scene scripts must not set the resolution or frame
+rate themselves; the profile decides both. manim's own intermediate files
+are kept per scene under .cache/manim-media/ so re-renders can reuse them.
+Static waits are encoded as one held frame instead of a frame per tick.
+
+Long scenes can be split into sections with manim's self.next_section(...).
+Each section of such a scene renders in its own process, all sections and
+scenes sharing the same pool of workers, and the section videos are joined
+without re-encoding, so a long scene takes about as long as its longest
+section.
+
+Renders are keyed by the scene's source: the script, the project modules
+it imports (shared helpers and style constants), render-scene.py, the
+scene name and the profile, plus the versions of manim and the libraries it renders with
+(see render_key). A scene whose key hasn't changed is not rendered again:
+its video is left alone, or copied from the render cache (see
+RENDER_CACHE_DIR). The keys and video hashes of the publish renders are
+committed in content/render-manifest.json, so --verify can check that
+every committed video was rendered from the current source.
+
+Usage:
+    python render-animations.py                  # every scene, publish quality
+    python render-animations.py --profile draft  # 480p15 previews
+    python render-animations.py dichotomous-choice   # one chapter
+    python render-animations.py GaltonBoardQuick     # one scene
+    python render-animations.py --list           # show scenes and outputs
+    python render-animations.py --jobs 2         # at most 2 renders at once
+    python render-animations.py --force          # render even if up to date
+    python render-animations.py --no-sections    # render sectioned scenes in one process
+    python render-animations.py --verify         # check committed videos match their source
+"""
+
+import ast
+import sys
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import functools
+import subprocess
+import importlib.util
+import importlib.metadata
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Project paths
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+ASSETS_DIR = PROJECT_ROOT / "public" / "assets"
+ANIMATION_GLOB = "*/animations/*.py"
+
+# manim working files and non-publish renders
+MEDIA_DIR = PROJECT_ROOT / ".cache" / "manim-media"
+RENDER_DIR = PROJECT_ROOT / ".cache" / "renders"
+
+# Finished videos by render key, shared by all profiles
+RENDER_CACHE_DIR = PROJECT_ROOT / ".cache" / "render-cache"
+RENDER_CACHE_VERSION = 1
+
+# Record of what each video was rendered from: committed for publish
+# renders, local for the others
+PUBLISH_MANIFEST_PATH = PROJECT_ROOT / "content" / "render-manifest.json"
+LOCAL_MANIFEST_PATH = RENDER_DIR / "manifest.json"
+
+# Libraries whose version changes invalidate renders
+RENDER_TRACKED_PACKAGES = ('manim', 'manimpango', 'pycairo', 'av', 'numpy', 'scipy')
+
+# Quality profiles: pixel size and frame rate
+PROFILES = {
+    'draft': {'resolution': (854, 480), 'fps': 15},
+    'review': {'resolution': (1280, 720), 'fps': 30},
+    'publish': {'resolution': (1920, 1080), 'fps': 60},
+}
+DEFAULT_PROFILE = 'publish'
+
+# Base classes that make a class a manim scene
+SCENE_BASES = frozenset({
+    'Scene', 'MovingCameraScene', 'ThreeDScene', 'ZoomedScene',
+    'VectorScene', 'LinearTransformationScene',
+})
+
+# Lines of a failed render's log to show
+LOG_TAIL = 20
+
+# Renders a scene or one of its sections in a manim process
+SCENE_SCRIPT = SCRIPT_DIR / "render-scene.py"
+
+
+def project_relative(path):
+    """Path relative to the project root, as a POSIX string when possible."""
+    try:
+        return Path(path).resolve().relative_to(PROJECT_ROOT.resolve()).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _base_name(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def find_scene_classes(path):
+    """
+    Names of the Scene subclasses defined at the top level of path, in
+    definition order. Classes deriving from another scene in the same file
+    count too.
+    """
+    tree = ast.parse(Path(path).read_text(encoding='utf-8'), filename=str(path))
+    classes = [node for node in tree.body if isinstance(node, ast.ClassDef)]
+    known = set(SCENE_BASES)
+    scenes = set()
+    changed = True
+    while changed:
+        changed = False
+        for node in classes:
+            if node.name not in scenes and any(_base_name(base) in known for base in node.bases):
+                scenes.add(node.name)
+                known.add(node.name)
+                changed = True
+    return [node.name for node in classes if node.name in scenes]
+
+
+def find_sectioned_scenes(path):
+    """Names of the classes in path whose methods call self.next_section()."""
+    tree = ast.parse(Path(path).read_text(encoding='utf-8'), filename=str(path))
+    sectioned = set()
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and any(
+                isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute)
+                and call.func.attr == 'next_section'
+                for call in ast.walk(node)):
+            sectioned.add(node.name)
+    return sectioned
+
+
+def discover_scenes(assets_dir=ASSETS_DIR):
+    """
+    Return one job dict per scene: 'path' (the script), 'chapter' (its
+    assets folder name), 'scene', 'name' (the output file stem) and
+    'sectioned' (whether the scene marks sections).
+    """
+    jobs = []
+    for path in sorted(Path(assets_dir).glob(ANIMATION_GLOB)):
+        try:
+            scenes = find_scene_classes(path)
+            sectioned = find_sectioned_scenes(path)
+        except SyntaxError as e:
+            print(f"Warning: skipping {project_relative(path)}: {e}", file=sys.stderr)
+            continue
+        for scene in scenes:
+            jobs.append({
+                'path': path,
+                'chapter': path.parent.parent.name,
+                'scene': scene,
+                'name': path.stem if len(scenes) == 1 else scene,
+                'sectioned': scene in sectioned,
+            })
+    return jobs
+
+
+def _module_files(name, search_dirs):
+    """The project files importing module name loads, if it is local."""
+    parts = name.split('.')
+    for base in search_dirs:
+        package_inits = []
+        for depth in range(1, len(parts)):
+            init = base.joinpath(*parts[:depth], "__init__.py")
+            if init.is_file():
+                package_inits.append(init)
+        for candidate in (base.joinpath(*parts).with_suffix('.py'),
+                          base.joinpath(*parts, "__init__.py")):
+            if candidate.is_file():
+                return package_inits + [candidate]
+    return []
+
+
+def scene_inputs(path):
+    """
+    The script at path and every project module it imports, directly or
+    through other project modules (looked up next to the importing file
+    and at the project root), sorted. Installed libraries are left out;
+    they are covered by their versions.
+    """
+    seen = set()
+    pending = [Path(path).resolve()]
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        try:
+            tree = ast.parse(current.read_text(encoding='utf-8'), filename=str(current))
+        except (OSError, SyntaxError):
+            continue
+        search_dirs = [current.parent, PROJECT_ROOT.resolve()]
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+                dirs = search_dirs
+            elif isinstance(node, ast.ImportFrom):
+                prefix = f"{node.module}." if node.module else ""
+                names = ([node.module] if node.module else []) + [
+                    prefix + alias.name for alias in node.names]
+                dirs = search_dirs if not node.level else [
+                    current.parent.joinpath(*[".."] * (node.level - 1)).resolve()]
+            else:
+                continue
+            for name in names:
+                pending += _module_files(name, dirs)
+    return sorted(seen)
+
+
+@functools.lru_cache(maxsize=None)
+def environment_fingerprint():
+    """Python and rendering library versions, as one string."""
+    parts = [f"python={sys.version.split()[0]}"]
+    for package in RENDER_TRACKED_PACKAGES:
+        try:
+            parts.append(f"{package}={importlib.metadata.version(package)}")
+        except importlib.metadata.PackageNotFoundError:
+            parts.append(f"{package}=none")
+    return ';'.join(parts)
+
+
+def source_key(job, profile):
+    """
+    Hash of what a render of job under profile is made from: the scene
+    name, the profile and the path and content of every scene_inputs()
+    file and of render-scene.py, which drives manim. Independent of the
+    installed libraries.
+    """
+    h = hashlib.sha256()
+    width, height = PROFILES[profile]['resolution']
+    h.update(f"{RENDER_CACHE_VERSION}\0{job['scene']}\0{width}x{height}@"
+             f"{PROFILES[profile]['fps']}".encode('utf-8'))
+    for path in [SCENE_SCRIPT] + scene_inputs(job['path']):
+        h.update(f"\0{project_relative(path)}\0{sha256_file(path)}".encode('utf-8'))
+    return h.hexdigest()
+
+
+def render_key(source):
+    """Cache key for a render: its source_key() and the library versions."""
+    return hashlib.sha256(f"{source}\0{environment_fingerprint()}".encode('utf-8')).hexdigest()
+
+
+class RenderManifest:
+    """
+    What each video was rendered from, keyed by the video's project path:
+    the scene, profile, source_key(), library versions and the video's
+    SHA-256.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.videos = json.load(f).get('videos', {})
+        except (OSError, ValueError):
+            self.videos = {}
+
+    def status(self, job, profile, source):
+        """
+        How the video for job compares with its record: 'current',
+        'environment' (same source, other library versions), 'stale'
+        (source changed), 'modified' (the file isn't the recorded render),
+        'missing' (recorded but gone), 'untracked' (no record) or
+        'unrendered' (neither a video nor a record).
+        """
+        target = output_path(job, profile)
+        entry = self.videos.get(project_relative(target))
+        if not target.is_file():
+            return 'missing' if entry is not None else 'unrendered'
+        if entry is None:
+            return 'untracked'
+        if entry['sha256'] != sha256_file(target):
+            return 'modified'
+        if entry['source'] != source:
+            return 'stale'
+        if entry['environment'] != environment_fingerprint():
+            return 'environment'
+        return 'current'
+
+    def record(self, job, profile, source, target):
+        self.videos[project_relative(target)] = {
+            'script': project_relative(job['path']),
+            'scene': job['scene'],
+            'profile': profile,
+            'source': source,
+            'environment': environment_fingerprint(),
+            'sha256': sha256_file(target),
+        }
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({'videos': dict(sorted(self.videos.items()))}, indent=2) + "\n"
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(data, encoding='utf-8')
+        os.replace(tmp, self.path)
+
+
+def manifest_path(profile):
+    return PUBLISH_MANIFEST_PATH if profile == 'publish' else LOCAL_MANIFEST_PATH
+
+
+def cached_render(key):
+    return RENDER_CACHE_DIR / key[:2] / f"{key}.mp4"
+
+
+def store_render(key, video):
+    """Copy a finished video into the render cache."""
+    target = cached_render(key)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    shutil.copyfile(video, tmp)
+    os.replace(tmp, target)
+
+
+def select_scenes(jobs, targets):
+    """
+    Keep the jobs matching any target: a chapter folder name, a script
+    path or file name, or a scene name. No targets keeps everything.
+    """
+    if not targets:
+        return jobs
+    selected = []
+    for job in jobs:
+        names = {job['chapter'], job['scene'], job['path'].name, job['path'].stem,
+                 project_relative(job['path'])}
+        if any(target in names or Path(target).resolve() == job['path'].resolve()
+               for target in targets):
+            selected.append(job)
+    return selected
+
+
+def output_path(job, profile):
+    """Where the finished video for job goes under profile."""
+    if profile == 'publish':
+        return job['path'].parent / f"{job['name']}.mp4"
+    return RENDER_DIR / profile / job['chapter'] / f"{job['name']}.mp4"
+
+
+def manim_command(job, profile, media_dir, section=None):
+    """
+    The render-scene.py command line rendering job (or only the given
+    section of it) under profile into media_dir.
+    """
+    width, height = PROFILES[profile]['resolution']
+    command = [
+        sys.executable, str(SCENE_SCRIPT),
+        '--resolution', f"{width},{height}",
+        '--frame_rate', str(PROFILES[profile]['fps']),
+        '--media_dir', str(media_dir),
+    ]
+    if section is None:
+        command += ['--output_file', job['name']]
+    else:
+        command += ['--section', str(section), '--output_file', section_name(job, section)]
+    return command + [str(job['path']), job['scene']]
+
+
+def count_command(job):
+    """The render-scene.py command line listing job's sections."""
+    return [sys.executable, str(SCENE_SCRIPT), '--count', str(job['path']), job['scene']]
+
+
+def section_name(job, section):
+    return f"{job['name']}-section-{section:02d}"
+
+
+def scene_media_dir(job):
+    media_dir = MEDIA_DIR / job['chapter'] / job['scene']
+    media_dir.mkdir(parents=True, exist_ok=True)
+    return media_dir
+
+
+def find_video(media_dir, profile, stem):
+    """The video manim wrote as videos/<module>/<height>p<fps>/<stem>.mp4, or None."""
+    width, height = PROFILES[profile]['resolution']
+    quality_dir = f"{height}p{PROFILES[profile]['fps']}"
+    videos = sorted((media_dir / "videos").glob(f"*/{quality_dir}/{stem}.mp4"))
+    return videos[0] if videos else None
+
+
+def run_render(command, job):
+    """Run a render command for job. Returns (ok, wall, log)."""
+    started = time.perf_counter()
+    process = subprocess.run(command, cwd=job['path'].parent, capture_output=True, text=True)
+    return (process.returncode == 0, time.perf_counter() - started,
+            process.stdout + process.stderr)
+
+
+def finish_render(job, profile, video, result):
+    """Copy video to output_path(), store it in the render cache and mark result ok."""
+    target = output_path(job, profile)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(video, target)
+    store_render(job['key'], target)
+    result.update(ok=True, output=target)
+    return result
+
+
+def render_scene(job, profile):
+    """
+    Render one scene, copy the video to output_path() and store it in the
+    render cache under job['key'].
+    Returns a result dict: the job, 'ok', 'wall', 'output' and 'log'.
+    """
+    media_dir = scene_media_dir(job)
+    ok, wall, log = run_render(manim_command(job, profile, media_dir), job)
+    result = {**job, 'ok': False, 'wall': wall, 'output': None, 'log': log}
+    if not ok:
+        return result
+    video = find_video(media_dir, profile, job['name'])
+    if video is None:
+        result['log'] += f"\nNo {job['name']}.mp4 found under {media_dir}/videos/"
+        return result
+    return finish_render(job, profile, video, result)
+
+
+def list_sections(job):
+    """
+    Play job's scene without rendering and return (section names, wall,
+    log); names is None if that failed.
+    """
+    ok, wall, log = run_render(count_command(job), job)
+    if ok:
+        # render-scene.py prints the names as a JSON list on the last line
+        listings = [line for line in log.splitlines() if line.startswith('[')]
+        try:
+            return json.loads(listings[-1]), wall, log
+        except (IndexError, ValueError):
+            pass
+    return None, wall, log
+
+
+def render_section(job, profile, section):
+    """Render one section of job. Returns (video or None, wall, log)."""
+    media_dir = scene_media_dir(job)
+    ok, wall, log = run_render(manim_command(job, profile, media_dir, section), job)
+    video = find_video(media_dir, profile, section_name(job, section)) if ok else None
+    if ok and video is None:
+        log += f"\nNo {section_name(job, section)}.mp4 found under {media_dir}/videos/"
+    return video, wall, log
+
+
+def join_videos(parts, target):
+    """
+    Join videos encoded with the same settings end to end into target,
+    copying the packets without re-encoding (like manim joins its partial
+    movie files).
+    """
+    import av
+
+    target = Path(target)
+    listing = target.with_name(f".{target.stem}.{os.getpid()}.txt")
+    tmp = target.with_name(f".{target.stem}.{os.getpid()}.tmp{target.suffix}")
+    quoted = (Path(part).resolve().as_posix().replace("'", "'\\''") for part in parts)
+    listing.write_text(''.join(f"file '{path}'\n" for path in quoted), encoding='utf-8')
+    try:
+        with av.open(str(listing), format='concat', options={'safe': '0'}) as source, \
+                av.open(str(tmp), mode='w') as output:
+            stream = source.streams.video[0]
+            if hasattr(output, 'add_stream_from_template'):
+                joined = output.add_stream_from_template(stream)
+            else:
+                joined = output.add_stream(template=stream)
+            for packet in source.demux(stream):
+                # Skip the flushing packets demux() ends with
+                if packet.dts is None:
+                    continue
+                # Let libav recompute decode times across the joins
+                packet.dts = None
+                packet.stream = joined
+                output.mux(packet)
+        os.replace(tmp, target)
+    finally:
+        listing.unlink(missing_ok=True)
+        tmp.unlink(missing_ok=True)
+
+
+def render_scenes(jobs, profile, workers, split=True):
+    """
+    Render jobs up to workers at a time; results come back in job order.
+    With split, scenes that mark sections are listed first and their
+    sections rendered as separate tasks in the same pool, then joined.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        tasks = []
+        for job in jobs:
+            if split and job['sectioned']:
+                tasks.append((job, pool.submit(list_sections, job)))
+            else:
+                tasks.append((job, pool.submit(render_scene, job, profile)))
+
+        # Queue the sections of each sectioned scene as soon as it is listed
+        sections = {}
+        for job, future in tasks:
+            if split and job['sectioned']:
+                names, wall, log = future.result()
+                sections[id(job)] = (names, wall, log, [
+                    pool.submit(render_section, job, profile, index)
+                    for index in range(len(names or []))])
+
+        results = []
+        for job, future in tasks:
+            if split and job['sectioned']:
+                result = join_sections(job, profile, *sections[id(job)])
+            else:
+                result = future.result()
+            label = f"{result['chapter']}/{result['scene']}"
+            if result['ok']:
+                parts = f", {result['sections']} sections" if result.get('sections') else ""
+                print(f"  ✓ {label} ({result['wall']:.1f}s{parts}) -> "
+                      f"{project_relative(result['output'])}")
+            else:
+                print(f"  ✗ {label} ({result['wall']:.1f}s)")
+                for line in result['log'].strip().splitlines()[-LOG_TAIL:]:
+                    print(f"      {line}")
+            results.append(result)
+    return results
+
+
+def join_sections(job, profile, names, wall, log, futures):
+    """
+    Wait for the section renders of job and join them into its video.
+    Returns a result dict like render_scene(), 'wall' being the listing
+    pass plus the slowest section, and 'sections' the number of sections.
+    """
+    result = {**job, 'ok': False, 'wall': wall, 'output': None, 'log': log,
+              'sections': len(names or [])}
+    if names is None:
+        result['log'] += "\nCould not list the scene's sections"
+        return result
+    videos = []
+    slowest = 0.0
+    for name, future in zip(names, futures):
+        video, section_wall, section_log = future.result()
+        slowest = max(slowest, section_wall)
+        if video is None:
+            result['log'] = f"Section {len(videos)} ({name}) failed:\n{section_log}"
+            return result
+        videos.append(video)
+    result['wall'] += slowest
+
+    joined = scene_media_dir(job) / f"{job['name']}.mp4"
+    try:
+        join_videos(videos, joined)
+    except Exception as e:
+        result['log'] = f"Joining {len(videos)} sections failed: {e}"
+        return result
+    return finish_render(job, profile, joined, result)
+
+
+def plan_renders(jobs, profile, manifest, force=False):
+    """
+    Work out each job's keys (job['source'], job['key']). Videos that are
+    current are left alone and videos in the render cache are copied into
+    place (both recorded in manifest); returns the jobs left to render.
+    """
+    pending = []
+    for job in jobs:
+        job['source'] = source_key(job, profile)
+        job['key'] = render_key(job['source'])
+        label = f"{job['chapter']}/{job['scene']}"
+        if not force and manifest.status(job, profile, job['source']) == 'current':
+            print(f"  = {label} up to date")
+            continue
+        cached = cached_render(job['key'])
+        if not force and cached.is_file():
+            target = output_path(job, profile)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(cached, target)
+            manifest.record(job, profile, job['source'], target)
+            print(f"  ↺ {label} restored from the render cache")
+            continue
+        pending.append(job)
+    return pending
+
+
+def verify_videos(jobs, profile, manifest):
+    """
+    Check each job's video against the manifest and print the ones that
+    don't match their current source. Returns True if they all do.
+
+    Videos committed before the manifest existed have no record yet: they
+    are reported but don't fail the check until they are re-rendered.
+    """
+    problems = {
+        'stale': "source changed since it was rendered",
+        'modified': "video differs from the recorded render",
+        'missing': "video not found",
+    }
+    ok = True
+    for job in jobs:
+        status = manifest.status(job, profile, source_key(job, profile))
+        target = project_relative(output_path(job, profile))
+        if status in problems:
+            ok = False
+            print(f"  ✗ {target}: {problems[status]}")
+        elif status == 'untracked':
+            print(f"  ! {target}: no record of what it was rendered from "
+                  f"(re-render it to check it)")
+        elif status == 'unrendered':
+            print(f"  - {target} (not rendered)")
+        elif status == 'environment':
+            print(f"  ✓ {target} (rendered with other library versions)")
+        else:
+            print(f"  ✓ {target}")
+    return ok
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render the manim scenes under public/assets/*/animations/.")
+    parser.add_argument('targets', nargs='*',
+                        help="chapter folders, scripts or scene names to render (default: all)")
+    parser.add_argument('-p', '--profile', choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help=f"quality profile (default: {DEFAULT_PROFILE})")
+    parser.add_argument('-j', '--jobs', type=int, default=0,
+                        help="number of scenes to render at once (0 = one per CPU)")
+    parser.add_argument('--force', action='store_true',
+                        help="render every selected scene, even if its video is up to date")
+    parser.add_argument('--no-sections', dest='sections', action='store_false',
+                        help="render scenes that mark sections in one process instead of "
+                             "one per section")
+    parser.add_argument('--list', action='store_true',
+                        help="list the scenes and where they would be written, then exit")
+    parser.add_argument('--verify', action='store_true',
+                        help="check that the videos were rendered from the current sources, then exit")
+    args = parser.parse_args(argv)
+    if args.jobs < 0:
+        parser.error("--jobs must be >= 0")
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    return args
+
+
+def main():
+    args = parse_args()
+    jobs = select_scenes(discover_scenes(), args.targets)
+    if not jobs:
+        print("No matching scenes found.")
+        sys.exit(1 if args.targets else 0)
+
+    if args.list:
+        for job in jobs:
+            print(f"{project_relative(job['path'])}::{job['scene']} -> "
+                  f"{project_relative(output_path(job, args.profile))}")
+        return
+
+    manifest = RenderManifest(manifest_path(args.profile))
+    if args.verify:
+        print(f"Verifying {len(jobs)} video(s) against {project_relative(manifest.path)}:\n")
+        if not verify_videos(jobs, args.profile, manifest):
+            sys.exit(1)
+        return
+
+    started = time.perf_counter()
+    jobs = plan_renders(jobs, args.profile, manifest, args.force)
+    results = []
+    if jobs:
+        if importlib.util.find_spec('manim') is None:
+            manifest.save()
+            print(f"Error: manim is not installed for {sys.executable}")
+            sys.exit(1)
+
+        width, height = PROFILES[args.profile]['resolution']
+        workers = args.jobs if args.sections else min(args.jobs, len(jobs))
+        print(f"\nRendering {len(jobs)} scene(s) at {width}x{height} "
+              f"{PROFILES[args.profile]['fps']}fps ({args.profile}), {workers} at a time:\n")
+        results = render_scenes(jobs, args.profile, workers, split=args.sections)
+        for result in results:
+            if result['ok']:
+                manifest.record(result, args.profile, result['source'], result['output'])
+    manifest.save()
+
+    if not results:
+        print("\nNothing to render.")
+        return
+    failed = [result for result in results if not result['ok']]
+    print(f"\nRendered {len(results) - len(failed)}/{len(results)} scene(s) "
+          f"in {time.perf_counter() - started:.1f}s")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Render a manim scene, or one section of it, for render-animations.py.
+
+Scenes mark their sections with manim's own self.next_section(...); the
+first section is everything before the first call. To render section N
+this script plays the scene from the start with every earlier section's
+animations skipped (manim still applies them, so the scene reaches the
+state section N starts from without rendering a frame), renders section N
+and stops at the start of the next one. The sections of a scene can then
+be rendered in separate processes and their videos joined end to end.
+Each section writes its partial movie files to its own folder, so several
+sections of one scene can render at once into the same media folder.
+
+Static stretches are held rather than re-encoded. manim already draws a
+wait() with nothing moving only once, but then encodes that frame again
+for every frame of the wait (180 times for wait(3) at 60 fps). Here the
+frame is encoded twice, at the start and the end of the wait, with
+timestamps that make the player show the first copy until the second
+(see hold_static_frames), so a wait costs about two frames to encode and
+store at any length.
+
+Usage (normally run by render-animations.py):
+    python render-scene.py --count script.py Scene       # print the section names as JSON
+    python render-scene.py --resolution 1920,1080 --frame_rate 60 \\
+        --media_dir DIR --output_file NAME script.py Scene
+    python render-scene.py --section 2 ... script.py Scene
+"""
+
+import sys
+import json
+import argparse
+import importlib.util
+from pathlib import Path
+
+# Project root, so scenes can import the shared dact package
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_scene_class(path, scene_name):
+    """Import the scene script the way manim does and return the class."""
+    path = Path(path).resolve()
+    sys.path[:0] = [str(path.parent), str(PROJECT_ROOT)]
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[path.stem] = module
+    spec.loader.exec_module(module)
+    return getattr(module, scene_name)
+
+
+def section_scene(scene_class, target):
+    """
+    A subclass of scene_class that only renders section target (None
+    renders nothing) and records the name of every section it reaches.
+    """
+    from manim.utils.exceptions import EndSceneEarlyException
+
+    class SectionScene(scene_class):
+        def setup(self):
+            super().setup()
+            self.section_names = [None]
+            if target != 0:
+                # The implicit first section can't be marked skipped; start a skipped one
+                scene_class.next_section(self, "skipped", skip_animations=True)
+
+        def next_section(self, name="unnamed", *args, **kwargs):
+            self.section_names.append(name)
+            number = len(self.section_names) - 1
+            if target is not None and number > target:
+                raise EndSceneEarlyException()
+            kwargs['skip_animations'] = kwargs.get('skip_animations', False) or number != target
+            super().next_section(name, *args, **kwargs)
+
+    SectionScene.__name__ = SectionScene.__qualname__ = scene_class.__name__
+    return SectionScene
+
+
+def hold_static_frames():
+    """
+    Make manim's movie writer encode a frame written num_frames times in
+    a row (a static wait) only twice: once where the hold starts and once
+    at its last frame. Every frame gets an explicit timestamp, so the gap
+    between the two copies plays as the first copy held; the stream's
+    frame rate stays the profile's. Returns False if this manim version
+    writes frames some other way (nothing is changed then).
+    """
+    from manim.scene.scene_file_writer import SceneFileWriter
+
+    if not hasattr(SceneFileWriter, 'encode_and_write_frame'):
+        return False
+    import av
+
+    def encode_and_write_frame(self, frame, num_frames):
+        # Timestamps restart with each partial movie file's stream
+        if getattr(self, '_held_stream', None) is not self.video_stream:
+            self._held_stream, self._next_pts = self.video_stream, 0
+        time_base = self.video_stream.codec_context.time_base
+        offsets = (0, num_frames - 1) if num_frames > 2 else range(num_frames)
+        for offset in offsets:
+            # A fresh frame each time: manim notes that reused frames encode wrongly
+            av_frame = av.VideoFrame.from_ndarray(frame, format="rgba")
+            av_frame.pts = self._next_pts + offset
+            if time_base is not None:
+                av_frame.time_base = time_base
+            for packet in self.video_stream.encode(av_frame):
+                self.video_container.mux(packet)
+        self._next_pts += num_frames
+
+    SceneFileWriter.encode_and_write_frame = encode_and_write_frame
+    return True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render a manim scene or one of its sections.")
+    parser.add_argument('script')
+    parser.add_argument('scene')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--section', type=int,
+                      help="render only this section (0 = first; default: the whole scene)")
+    mode.add_argument('--count', action='store_true',
+                      help="play the scene without rendering and print its section names as JSON")
+    parser.add_argument('--resolution', default="854,480", help="pixel width,height")
+    parser.add_argument('--frame_rate', type=float, default=15)
+    parser.add_argument('--media_dir', default="media")
+    parser.add_argument('--output_file', default=None)
+    parser.add_argument('--no-hold', dest='hold', action='store_false',
+                        help="encode every frame of static waits")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    from manim import config
+
+    width, height = (int(value) for value in args.resolution.split(','))
+    config.pixel_width = width
+    config.pixel_height = height
+    config.frame_rate = args.frame_rate
+    config.media_dir = args.media_dir
+    config.input_file = str(Path(args.script).resolve())
+    config.progress_bar = 'none'
+    config.verbosity = 'WARNING'
+    if args.count:
+        config.dry_run = True
+    elif args.section is None:
+        config.output_file = args.output_file or args.scene
+    else:
+        config.output_file = args.output_file or f"{args.scene}-section-{args.section:02d}"
+        config.partial_movie_dir = (
+            f"{{video_dir}}/partial_movie_files/{{scene_name}}-section-{args.section:02d}")
+    if args.hold and not args.count and not hold_static_frames():
+        print("Warning: this manim version can't hold static frames; encoding every frame",
+              file=sys.stderr)
+
+    scene_class = load_scene_class(args.script, args.scene)
+    if args.count or args.section is not None:
+        scene_class = section_scene(scene_class, None if args.count else args.section)
+    scene = scene_class()
+    scene.render()
+
+    if args.count:
+        names = scene.section_names
+        names[0] = names[0] or "start"
+        print(json.dumps(names))
+    elif args.section is not None and args.section >= len(scene.section_names):
+        print(f"{args.scene} has no section {args.section}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
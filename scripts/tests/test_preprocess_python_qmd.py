@@ -0,0 +1,206 @@
+"""
+Tests for scripts/preprocess-python-qmd.py: the block plan (which blocks
+depend on which, and which may run forked), the execution cache keys and
+resuming from namespace checkpoints.
+
+Run from the project root:
+    python -m unittest discover -s scripts/tests
+"""
+
+import io
+import shutil
+import tempfile
+import unittest
+import importlib.util
+from pathlib import Path
+from contextlib import redirect_stdout, redirect_stderr
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+SCRIPT = Path(__file__).resolve().parent.parent / "preprocess-python-qmd.py"
+spec = importlib.util.spec_from_file_location("preprocess_python_qmd", SCRIPT)
+pp = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(pp)
+
+
+def blocks_of(*codes):
+    return pp.plan_blocks([{'code': code, 'line': n} for n, code in enumerate(codes)])
+
+
+class PlanBlocksTest(unittest.TestCase):
+
+    def test_reader_depends_on_writer(self):
+        blocks = blocks_of("x = 1", "y = 2", "print(x)")
+        self.assertEqual(blocks[2]['deps'], [0])
+        self.assertFalse(blocks[0]['leaf'])
+        self.assertTrue(blocks[1]['leaf'])
+
+    def test_mutating_method_is_a_write(self):
+        blocks = blocks_of("items = []", "items.append(1)", "print(items)")
+        self.assertIn(1, blocks[2]['deps'])
+        self.assertFalse(blocks[1]['leaf'])
+
+    def test_function_call_reads_what_the_body_reads(self):
+        blocks = blocks_of("x = 1", "def show():\n    print(x)", "show()")
+        self.assertEqual(sorted(blocks[2]['deps']), [0, 1])
+
+    def test_module_configuration_is_a_barrier(self):
+        blocks = blocks_of("import numpy as np\nimport pandas as pd",
+                           "np.set_printoptions(precision=2)",
+                           "pd.set_option('display.precision', 1)",
+                           "print(np.array([1.23456]))")
+        for config in blocks[1:3]:
+            self.assertFalse(config['leaf'])
+        self.assertEqual(blocks[3]['deps'], [0, 1, 2])
+
+    def test_preloaded_module_configuration_is_a_barrier(self):
+        blocks = blocks_of("plt.rcParams.update({'font.size': 8})", "print(1)")
+        self.assertFalse(blocks[0]['leaf'])
+        self.assertEqual(blocks[1]['deps'], [0])
+
+    def test_assigned_module_call_is_not_a_barrier(self):
+        blocks = blocks_of("import numpy as np", "x = np.arange(3)", "print(np.pi)")
+        self.assertTrue(blocks[1]['leaf'])
+        self.assertEqual(blocks[2]['deps'], [0])
+
+
+class ChapterTest(unittest.TestCase):
+    """Builds a throwaway chapter in a temporary directory."""
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp(prefix='qmd-test-'))
+        self.qmd = self.dir / "index.qmd"
+        self.cache = pp.ExecutionCache(self.dir / "cache")
+        # Blocks run in this process: don't let library settings leak between tests
+        self.addCleanup(np.set_printoptions, **np.get_printoptions())
+        self.addCleanup(pd.set_option, 'display.precision', pd.get_option('display.precision'))
+        self.addCleanup(plt.close, 'all')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def write(self, *codes):
+        self.qmd.write_text("# Test\n\n" + "\n".join(
+            f"```python\n{code}\n```\n" for code in codes), encoding='utf-8')
+
+    def build(self, cache=None, branches=1, checkpoints=None):
+        """Process the chapter; returns (block stdouts, everything it printed)."""
+        log = io.StringIO()
+        with redirect_stdout(log), redirect_stderr(log):
+            execute = pp.make_executor(branches=branches, checkpoints=checkpoints)
+            result = pp.process_qmd_file(self.qmd, cache, execute)
+        for output in result['outputs']:
+            self.assertIsNone(output['error'])
+        return [output['stdout'] for output in result['outputs']], log.getvalue()
+
+
+CONFIG_CHAPTER = (
+    "import numpy as np\nimport pandas as pd",
+    "np.set_printoptions(precision={0})\npd.set_option('display.precision', {1})",
+    "print(np.array([1.23456]))\nprint(pd.DataFrame({{'x': [1.23456]}}).to_string(index=False))",
+)
+
+
+class ModuleStateTest(ChapterTest):
+
+    def test_configuration_reaches_later_blocks_when_forking(self):
+        self.write(*(code.format(2, 1) for code in CONFIG_CHAPTER))
+        stdouts, _ = self.build(branches=4)
+        self.assertEqual(stdouts[2].split(), ['[1.23]', 'x', '1.2'])
+
+    def test_default_is_strictly_in_order(self):
+        self.assertEqual(pp.parse_args([]).branches, 1)
+
+
+class FigureTest(ChapterTest):
+
+    def test_figure_set_up_in_an_earlier_block(self):
+        self.write("fig = plt.figure(figsize=(3, 2))",
+                   "plt.plot([1, 2])\nplt.savefig('figures/line.png')\nprint(plt.gcf() is fig)")
+        stdouts, _ = self.build()
+        self.assertEqual(stdouts[1], "True")
+        self.assertEqual(plt.imread(self.dir / "figures" / "line.png").shape[:2], (200, 300))
+
+    def test_drawn_figures_are_saved_and_closed(self):
+        self.write("plt.plot([1, 2])", "plt.figure()\nprint(len(plt.get_fignums()))")
+        stdouts, _ = self.build()
+        self.assertEqual(len(list((self.dir / "figures").glob(f"{pp.AUTO_FIGURE_PREFIX}*.png"))), 1)
+        self.assertEqual(stdouts[1], "1")
+
+
+class CacheKeyTest(ChapterTest):
+
+    def keys(self, *codes):
+        return pp.block_cache_keys(blocks_of(*codes), self.dir)
+
+    def test_unrelated_edit_keeps_key(self):
+        before = self.keys("x = 1", "y = 2", "print(x)")
+        after = self.keys("x = 1", "y = 3", "print(x)")
+        self.assertEqual(before[2], after[2])
+        self.assertNotEqual(before[1], after[1])
+
+    def test_upstream_edit_changes_key(self):
+        before = self.keys("x = 1", "print(x)")
+        after = self.keys("x = 2", "print(x)")
+        self.assertNotEqual(before[1], after[1])
+
+    def test_library_call_upstream_changes_key(self):
+        # Not a barrier (its result is assigned), but it may still change library state
+        before = self.keys("import numpy as np", "old = np.seterr(all='ignore')", "print(1)")
+        after = self.keys("import numpy as np", "old = np.seterr(all='warn')", "print(1)")
+        self.assertNotEqual(before[2], after[2])
+
+    def test_configuration_edit_reruns_downstream(self):
+        self.write(*(code.format(2, 1) for code in CONFIG_CHAPTER))
+        stdouts, _ = self.build(self.cache)
+        self.assertEqual(stdouts[2].split(), ['[1.23]', 'x', '1.2'])
+
+        self.write(*(code.format(4, 3) for code in CONFIG_CHAPTER))
+        stdouts, _ = self.build(self.cache)
+        self.assertEqual(stdouts[2].split(), ['[1.2346]', 'x', '1.235'])
+
+    def test_unchanged_chapter_replays(self):
+        self.write("x = 21", "print(x * 2)")
+        self.build(self.cache)
+        stdouts, log = self.build(self.cache)
+        self.assertEqual(stdouts[1], "42")
+        self.assertIn("Replayed 2 blocks from cache", log)
+
+
+class CheckpointResumeTest(ChapterTest):
+
+    def setUp(self):
+        super().setUp()
+        self.checkpoints = pp.NamespaceCheckpoints(self.dir / "checkpoints")
+        self.interval = pp.CHECKPOINT_INTERVAL
+        pp.CHECKPOINT_INTERVAL = 0.0
+
+    def tearDown(self):
+        pp.CHECKPOINT_INTERVAL = self.interval
+        super().tearDown()
+
+    def test_resume_after_unchanged_prefix(self):
+        slow = "import time\ntime.sleep(0.3)\ndata = list(range(5))"
+        self.write(slow, "print(sum(data))")
+        stdouts, _ = self.build(checkpoints=self.checkpoints)
+        self.assertEqual(stdouts[1], "10")
+
+        self.write(slow, "print(max(data))")
+        stdouts, log = self.build(checkpoints=self.checkpoints)
+        self.assertIn("Resuming from checkpoint after block 1", log)
+        self.assertEqual(stdouts[1], "4")
+
+    def test_no_resume_past_changed_block(self):
+        self.write("import time\ntime.sleep(0.3)\nx = 1", "print(x)")
+        self.build(checkpoints=self.checkpoints)
+
+        self.write("import time\ntime.sleep(0.3)\nx = 2", "print(x)")
+        stdouts, log = self.build(checkpoints=self.checkpoints)
+        self.assertNotIn("Resuming from checkpoint", log)
+        self.assertEqual(stdouts[1], "2")
+
+
+if __name__ == '__main__':
+    unittest.main()